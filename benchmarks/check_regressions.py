@@ -0,0 +1,233 @@
+# benchmarks/check_regressions.py
+"""
+Numerical regression checks.
+
+Small, deterministic scenarios for behaviour that the timing suite in
+run_benchmarks.py cannot catch (wrong numbers from a fast path). Each check
+raises AssertionError on failure; the script exits with status 1 when any
+check fails.
+
+    python benchmarks/check_regressions.py
+    python benchmarks/check_regressions.py --checks panel   # 只跑名字包含子串的检查
+"""
+import argparse
+import os
+import sys
+import tempfile
+import traceback
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.backtester.cost import (
+    HighLowSpread,
+    ParticipationSlippage,
+    SquareRootImpact,
+    TieredCommission,
+)
+from src.backtester.engine import BacktestEngine
+from src.backtester.exits import apply_exits
+from src.backtester.sizing import VolTargetSizer
+from src.data.store import StoreWriter, load_frame
+from src.strategies import apply_strategy
+from src.strategies.panel import apply_strategy_panel
+from src.utils.rolling import RollingWindowCache, use_rolling_cache
+
+CHECKS = {}
+
+
+def check(func):
+    CHECKS[func.__name__] = func
+    return func
+
+
+# ============================================================
+# Checks
+# ============================================================
+@check
+def panel_gap_carries_return():
+    """停牌缺口内保持持仓：不收成本，跨缺口收益记到下一根有价格的 bar。"""
+    idx = pd.date_range("2024-01-01", periods=60, freq="D")
+    price = 100.0 * np.exp(np.cumsum(np.full(60, 0.01)))   # 单调上涨 → ma 策略做多
+    close = pd.DataFrame({"A": price}, index=idx)
+    gap = 45
+    close.iloc[gap, 0] = np.nan
+    panel = {f: close for f in ["Open", "High", "Low", "Close"]}
+
+    signal = apply_strategy_panel(panel, "ma", short_window=3, long_window=10)
+    assert signal.iloc[gap, 0] == signal.iloc[gap - 1, 0] == 1.0, signal.iloc[gap - 2:gap + 2]
+
+    engine = BacktestEngine(initial_capital=1.0, commission=0.0005, slippage=0.0002)
+    res = engine.run_panel(close, signal)
+    cost = res["cost"]["A"].to_numpy()
+    net = res["net_ret"]["A"].to_numpy()
+    assert cost[gap] == 0.0 and cost[gap + 1] == 0.0, cost[gap - 1:gap + 3]
+    assert net[gap] == 0.0
+    np.testing.assert_allclose(net[gap + 1], price[gap + 1] / price[gap - 1] - 1.0)
+
+
+@check
+def panel_cost_models_match_single_symbol():
+    """run_panel 把 High / Low / Volume panel 传给成本模型，每列与单标的 run 一致。"""
+    rng = np.random.default_rng(11)
+    n = 300
+    idx = pd.date_range("2024-01-01", periods=n, freq="D")
+    close = pd.DataFrame(100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, (n, 2)), axis=0)),
+                         index=idx, columns=["A", "B"])
+    noise = np.abs(rng.normal(0.0, 0.005, (n, 2)))
+    panel = {
+        "Close": close,
+        "High": close * (1.0 + noise),
+        "Low": close * (1.0 - noise),
+        "Volume": pd.DataFrame(rng.integers(1_000, 5_000, (n, 2)).astype(float), index=idx, columns=close.columns),
+    }
+    signal = pd.DataFrame(np.sign(rng.normal(size=(n, 2))), index=idx, columns=close.columns)
+
+    for model in (HighLowSpread(), ParticipationSlippage(), SquareRootImpact()):
+        engine = BacktestEngine(cost_model=model)
+        # 打乱 bars 的行 / 列顺序，run_panel 需要按 close 对齐
+        shuffled = {f: wide.iloc[::-1, ::-1] for f, wide in panel.items() if f != "Close"}
+        res = engine.run_panel(close, signal, bars=shuffled)
+        for sym in close.columns:
+            df = pd.DataFrame({f: wide[sym] for f, wide in panel.items()})
+            df["signal"] = signal[sym]
+            single = engine.run(df)
+            np.testing.assert_allclose(res["cost"][sym].to_numpy(), single["cost"].to_numpy(),
+                                       err_msg=type(model).__name__)
+            assert single["cost"].sum() > 0
+
+
+@check
+def cost_models_use_running_equity():
+    """compound_costs：每根 bar 的成本按上一根 bar 的净值计算，lean 模式结果相同。"""
+    rng = np.random.default_rng(5)
+    n = 1_500
+    close = 100.0 * np.exp(np.cumsum(0.0015 + rng.normal(0.0, 0.005, n)))
+    df = pd.DataFrame({
+        "Close": close,
+        "Volume": rng.integers(5_000, 20_000, n).astype(float),
+        "signal": np.where(np.arange(n) % 50 < 45, 1.0, 0.0),
+    }, index=pd.date_range("2020-01-01", periods=n, freq="D"))
+    model = SquareRootImpact() + TieredCommission([(0, 0.001), (1e5, 0.0005)], min_fee=1.0)
+
+    engine = BacktestEngine(cost_model=model)
+    res = engine.run(df)
+    equity = res["equity"].to_numpy()
+    assert equity[-1] > 5 * engine.initial_capital, equity[-1]
+
+    capital = np.concatenate([[engine.initial_capital], equity[:-1]])[:, None]
+    bars = {c: df[c].to_numpy()[:, None] for c in ["Close", "Volume"]}
+    commission, slippage = model(res["trade_flag"].to_numpy()[:, None], bars, capital)
+    np.testing.assert_allclose(res["cost"].to_numpy(), (commission + slippage)[:, 0], rtol=1e-9, atol=1e-15)
+
+    lean = engine.run(df, columns=["cost"])
+    np.testing.assert_allclose(lean["cost"].to_numpy(), res["cost"].to_numpy(), rtol=1e-12)
+
+    fixed = BacktestEngine(cost_model=model, compound_costs=False).run(df)
+    tail = slice(n - 200, n)
+    assert res["cost"].iloc[tail].sum() > fixed["cost"].iloc[tail].sum()
+
+
+@check
+def sized_exits_go_flat():
+    """止损出场 bar 之后仓位必须为 0，即使 sizer 限制了换手。"""
+    rng = np.random.default_rng(7)
+    n = 600
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, n)))
+    noise = np.abs(rng.normal(0.0, 0.006, n))
+    df = pd.DataFrame({
+        "Open": close * (1.0 + rng.normal(0.0, 0.002, n)),
+        "High": close * (1.0 + noise),
+        "Low": close * (1.0 - noise),
+        "Close": close,
+        "signal": np.where(np.arange(n) // 40 % 2 == 0, 1.0, -1.0),
+    }, index=pd.date_range("2024-01-01", periods=n, freq="D"))
+    df = apply_exits(df, stop_loss=0.005)
+    hits = np.flatnonzero(df["exit_price"].notna().to_numpy())
+    assert len(hits) > 10, len(hits)
+
+    engine = BacktestEngine(sizer=VolTargetSizer(max_turnover=0.2))
+    for res in (engine.run(df), engine.run(df, columns=["position"])):
+        pos = res["position"].to_numpy()
+        hits_in = hits[hits + 1 < n]
+        assert np.all(pos[hits_in + 1] == 0.0), pos[hits_in + 1]
+
+
+@check
+def rolling_cache_matches_pandas():
+    """长周期、趋势明显的价格上，缓存的 rolling mean / std 与 pandas 逐位一致，信号也一致。"""
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    close = np.round(55.0 * np.exp(np.cumsum(rng.normal(2e-6, 8e-4, n))), 2)
+    price = pd.Series(close, index=pd.date_range("2020-01-01", periods=n, freq="min"), name="Close")
+
+    cache = RollingWindowCache(price)
+    for window in (5, 20, 200):
+        np.testing.assert_array_equal(cache.mean(window), price.rolling(window).mean().to_numpy())
+        np.testing.assert_array_equal(cache.std(window), price.rolling(window).std().to_numpy())
+
+    df = pd.DataFrame({"Close": price})
+    for name, params in [("ma", {"short_window": 5, "long_window": 20}), ("bollinger", {"window": 20})]:
+        plain = apply_strategy(df.copy(), name, **params)["signal"].to_numpy()
+        with use_rolling_cache(cache):
+            cached = apply_strategy(df.copy(), name, **params)["signal"].to_numpy()
+        np.testing.assert_array_equal(cached, plain, err_msg=name)
+
+
+@check
+def store_writer_merges_unsorted_chunks():
+    """乱序分块写入（含重复时间戳）后，store 与整体稳定排序的结果一致。"""
+    rng = np.random.default_rng(3)
+    n = 20_000
+    ts = pd.to_datetime(rng.integers(0, 5_000, n) * 60, unit="s")
+    df = pd.DataFrame({"Close": np.arange(n, dtype=float), "Volume": rng.random(n)}, index=ts)
+
+    with tempfile.TemporaryDirectory(prefix="qbt_check_") as tmp:
+        path = os.path.join(tmp, "store")
+        writer = StoreWriter(path, block_rows=700)
+        for start in range(0, n, 1_500):
+            writer.append(df.iloc[start:start + 1_500])
+        writer.close()
+        got = load_frame(path)
+
+    expected = df.sort_index(kind="stable")
+    assert got.index.equals(expected.index)
+    np.testing.assert_array_equal(got.to_numpy(), expected.to_numpy())
+
+
+# ============================================================
+# Runner
+# ============================================================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Quant backtester numerical regression checks")
+    parser.add_argument("--checks", default=None, help="只跑名字包含这些子串的检查（逗号分隔）")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    os.chdir(ROOT)
+
+    names = list(CHECKS)
+    if args.checks:
+        wanted = [s.strip() for s in args.checks.split(",")]
+        names = [n for n in names if any(w in n for w in wanted)]
+
+    failed = []
+    for name in names:
+        try:
+            CHECKS[name]()
+            print(f"  {name:<40} ok")
+        except Exception:
+            failed.append(name)
+            print(f"  {name:<40} FAILED")
+            traceback.print_exc()
+
+    print(f"\n{len(names) - len(failed)}/{len(names)} checks passed.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+# benchmarks/run_benchmarks.py
+"""
+Performance benchmark suite.
+
+Generates synthetic OHLCV data at several sizes and, for each size, times and
+measures the peak traced memory of every pipeline stage:
+
+    load_data (CSV parse + cache hit), generate_factors, each strategy in
+    STRATEGY_REGISTRY, the exit overlay, BacktestEngine.run, generate_trade_log, the risk
+    metrics and the MA grid search.
+
+Results are written as JSON. Each stage is compared to the stored baseline
+(benchmarks/baseline.json by default) and the script exits with status 1 when
+any stage is slower (or uses more memory) than the allowed ratio. Baselines
+are machine-specific, so none is committed: record one on the machine that
+runs the comparison. Without a baseline the default run only reports; passing
+--baseline explicitly makes a missing file an error (exit status 2), which is
+what CI should do.
+
+    python benchmarks/run_benchmarks.py --sizes 10k,100k --update-baseline
+    python benchmarks/run_benchmarks.py --sizes 10k,100k          # 对比 baseline
+    python benchmarks/run_benchmarks.py --sizes 10k,100k --baseline benchmarks/baseline.json
+
+Timing runs and the tracemalloc run are separate, so tracing overhead does not
+leak into the reported seconds.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.config import INITIAL_CAPITAL, COMMISSION, SLIPPAGE, RISK_FREQ, MA_SHORT_RANGE, MA_LONG_RANGE
+from src.data.loader import load_data
+from src.factors.factor_engine import generate_factors
+from src.strategies import STRATEGY_REGISTRY, apply_strategy
+from src.backtester.engine import BacktestEngine
+from src.backtester.exits import exit_overlay
+from src.backtester.sizing import VolTargetSizer
+from src.backtester.trade_log import generate_trade_log
+from src.backtester.metrics import sharpe_ratio, max_drawdown, volatility
+from src.optimizer.grid_search import grid_search_ma
+
+DEFAULT_SIZES = "10k,100k,1m,10m"
+DEFAULT_OUT = os.path.join(ROOT, "benchmarks", "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+# 慢阶段只在不超过该行数的规模上跑（可用 --no-caps 关闭）
+STAGE_MAX_ROWS = {
+    "strategy:meta_transformer": 100_000,
+    "grid_search_ma": 1_000_000,
+}
+
+
+# ============================================================
+# Synthetic data
+# ============================================================
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * mult)
+
+
+def synthetic_ohlcv(n: int, seed: int = 0) -> pd.DataFrame:
+    """几何布朗运动 + regime 切换的小时线 OHLCV，列格式与 data/raw/data.csv 一致。"""
+    rng = np.random.default_rng(seed)
+
+    # 每 ~500 根 bar 切换一次波动率 regime，让趋势 / 均值回归策略都有交易
+    regime = np.repeat(rng.choice([0.004, 0.01, 0.02], size=n // 500 + 1), 500)[:n]
+    drift = np.repeat(rng.normal(0, 0.0005, size=n // 500 + 1), 500)[:n]
+    log_ret = drift + regime * rng.standard_normal(n)
+
+    close = 100.0 * np.exp(np.cumsum(log_ret))
+    open_ = np.empty(n)
+    open_[0] = 100.0
+    open_[1:] = close[:-1]
+    spread = np.abs(rng.standard_normal(n)) * regime * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.integers(1_000, 1_000_000, size=n)
+
+    index = pd.date_range("2000-01-03 14:30", periods=n, freq="h", tz="UTC")
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=pd.Index(index, name="Datetime"),
+    )
+
+
+# ============================================================
+# Measurement
+# ============================================================
+def measure(func, repeat: int = 1) -> dict:
+    """
+    func 先跑 repeat 次取最短耗时，再在 tracemalloc 下跑一次取峰值内存。
+    返回 {"seconds", "peak_mem_bytes", "result"}。
+    """
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        result = None
+        gc.collect()
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+
+    result = None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": best, "peak_mem_bytes": int(peak), "result": result}
+
+
+def build_stages(df: pd.DataFrame, csv_path: str, cache_dir: str):
+    """
+    按依赖顺序生成 (name, func)。后面的阶段使用前面阶段的结果，
+    因此每个阶段都在 measure() 之后才构造下一个。
+    """
+    engine = BacktestEngine(initial_capital=INITIAL_CAPITAL, commission=COMMISSION, slippage=SLIPPAGE)
+
+    yield "load_data:csv", lambda: load_data(csv_path, use_cache=False)
+    yield "load_data:cache_write", lambda: (shutil.rmtree(cache_dir, ignore_errors=True),
+                                            load_data(csv_path, cache_dir=cache_dir))[1]
+    yield "load_data:cache_hit", lambda: load_data(csv_path, cache_dir=cache_dir)
+    yield "generate_factors", lambda: generate_factors(df)
+
+    for name in STRATEGY_REGISTRY:
+        yield f"strategy:{name}", (lambda name=name: apply_strategy(df.copy(), name))
+
+    df_sig = apply_strategy(df.copy(), "ma")
+
+    exit_args = [df_sig[c].to_numpy(dtype=float) for c in ["signal", "High", "Low", "Close", "Open"]]
+    exit_params = {"stop_loss": 0.02, "take_profit": 0.05, "trailing_stop": 0.03, "max_bars": 200}
+    exit_overlay(*[a[:100] for a in exit_args], **exit_params)   # numba 编译不计入耗时
+    yield "exit_overlay", lambda: exit_overlay(*exit_args, **exit_params)
+
+    yield "engine.run", lambda: engine.run(df_sig)
+
+    sized = BacktestEngine(
+        initial_capital=INITIAL_CAPITAL, commission=COMMISSION, slippage=SLIPPAGE,
+        sizer=VolTargetSizer(freq=RISK_FREQ, max_leverage=2.0, max_turnover=0.5),
+    )
+    sized.run(df_sig.iloc[:100])   # numba 编译不计入耗时
+    yield "engine.run:vol_target", lambda: sized.run(df_sig)
+
+    df_bt = engine.run(df_sig)
+    yield "generate_trade_log", lambda: generate_trade_log(df_bt)
+    yield "metrics:sharpe_ratio", lambda: sharpe_ratio(df_bt, freq=RISK_FREQ)
+    yield "metrics:max_drawdown", lambda: max_drawdown(df_bt)
+    yield "metrics:volatility", lambda: volatility(df_bt, freq=RISK_FREQ)
+
+    yield "grid_search_ma", lambda: grid_search_ma(
+        df,
+        short_range=MA_SHORT_RANGE,
+        long_range=MA_LONG_RANGE,
+        commission=COMMISSION,
+        slippage=SLIPPAGE,
+    )
+
+
+def run_size(n: int, data_dir: str, repeat: int, stage_filter=None, caps: bool = True) -> list:
+    print(f"\n=== {n:,} bars ===")
+    df = synthetic_ohlcv(n)
+    csv_path = os.path.join(data_dir, f"ohlcv_{n}.csv")
+    if not os.path.exists(csv_path):
+        df.to_csv(csv_path)
+    cache_dir = os.path.join(data_dir, f"cache_{n}")
+
+    # 与 load_data 返回的数据保持同一格式（索引 / dtype）
+    df = load_data(csv_path, use_cache=False)
+
+    # 大规模数据上 repeat 意义不大，只跑一次
+    n_repeat = repeat if n <= 100_000 else 1
+
+    rows = []
+    for stage, func in build_stages(df, csv_path, cache_dir):
+        if stage_filter and not any(s in stage for s in stage_filter):
+            continue
+        if caps and n > STAGE_MAX_ROWS.get(stage, n):
+            print(f"  {stage:<32} skipped (> {STAGE_MAX_ROWS[stage]:,} rows)")
+            continue
+
+        row = {"size": n, "stage": stage}
+        try:
+            m = measure(func, repeat=n_repeat)
+            row.update(seconds=m["seconds"], peak_mem_bytes=m["peak_mem_bytes"])
+            print(f"  {stage:<32} {m['seconds']:>9.4f}s  {m['peak_mem_bytes'] / 2**20:>9.1f} MiB")
+        except Exception as e:  # 单个阶段失败不影响其余阶段
+            row["error"] = f"{type(e).__name__}: {e}"
+            print(f"  {stage:<32} ERROR {row['error']}")
+        rows.append(row)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return rows
+
+
+# ============================================================
+# Baseline comparison
+# ============================================================
+def compare(results: list, baseline: list, time_ratio: float, mem_ratio: float,
+            min_seconds: float, min_mem_bytes: int) -> list:
+    """
+    返回回归列表。差值低于 min_seconds / min_mem_bytes 的视为噪声，不算回归。
+    """
+    base = {(r["size"], r["stage"]): r for r in baseline if "error" not in r}
+    regressions = []
+
+    for r in results:
+        b = base.get((r["size"], r["stage"]))
+        if b is None:
+            continue
+        if "error" in r:
+            regressions.append({**r, "metric": "error"})
+            continue
+
+        checks = [
+            ("seconds", time_ratio, min_seconds),
+            ("peak_mem_bytes", mem_ratio, min_mem_bytes),
+        ]
+        for key, ratio, floor in checks:
+            cur, ref = r[key], b[key]
+            if cur > ref * ratio and cur - ref > floor:
+                regressions.append({
+                    "size": r["size"],
+                    "stage": r["stage"],
+                    "metric": key,
+                    "baseline": ref,
+                    "current": cur,
+                    "ratio": cur / ref if ref else float("inf"),
+                })
+
+    return regressions
+
+
+def _environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Quant backtester performance benchmarks")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="逗号分隔，如 10k,100k,1m,10m")
+    parser.add_argument("--stages", default=None, help="只跑名字包含这些子串的阶段（逗号分隔）")
+    parser.add_argument("--repeat", type=int, default=3, help="≤100k 行时每个阶段计时次数（取最短）")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="结果 JSON 路径")
+    parser.add_argument("--baseline", default=None,
+                        help=f"baseline JSON 路径（默认 {os.path.relpath(DEFAULT_BASELINE, ROOT)}；显式指定时文件必须存在）")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写成新的 baseline")
+    parser.add_argument("--time-ratio", type=float, default=1.25, help="耗时超过 baseline 的倍数视为回归")
+    parser.add_argument("--mem-ratio", type=float, default=1.25, help="峰值内存超过 baseline 的倍数视为回归")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="耗时差低于该值不算回归")
+    parser.add_argument("--min-mem-mb", type=float, default=8.0, help="内存差低于该值 (MiB) 不算回归")
+    parser.add_argument("--data-dir", default=None, help="合成 CSV 存放目录（默认临时目录，跑完删除）")
+    parser.add_argument("--no-caps", action="store_true", help="慢阶段也在大规模数据上跑")
+    args = parser.parse_args(argv)
+
+    require_baseline = args.baseline is not None
+    if args.baseline is None:
+        args.baseline = DEFAULT_BASELINE
+    if require_baseline and not args.update_baseline and not os.path.exists(args.baseline):
+        # 先检查再跑，避免跑完整套才发现没有 baseline
+        print(f"Baseline not found: {args.baseline}; run with --update-baseline to create it.")
+        return 2
+
+    warnings.filterwarnings("ignore")
+    # 策略里的相对路径（models/...）以仓库根目录为准
+    os.chdir(ROOT)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    stage_filter = [s.strip() for s in args.stages.split(",")] if args.stages else None
+
+    tmp = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="qbt_bench_")
+        data_dir = tmp.name
+    os.makedirs(data_dir, exist_ok=True)
+
+    try:
+        results = []
+        for n in sizes:
+            results.extend(run_size(n, data_dir, args.repeat, stage_filter, caps=not args.no_caps))
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    report = {"environment": _environment(), "sizes": sizes, "results": results}
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = compare(
+        results,
+        baseline,
+        time_ratio=args.time_ratio,
+        mem_ratio=args.mem_ratio,
+        min_seconds=args.min_seconds,
+        min_mem_bytes=int(args.min_mem_mb * 2**20),
+    )
+
+    if not regressions:
+        print("No regressions against baseline.")
+        return 0
+
+    print(f"\n{len(regressions)} regression(s) against baseline:")
+    for r in regressions:
+        if r["metric"] == "error":
+            print(f"  {r['size']:>10,}  {r['stage']:<32} {r['error']}")
+        else:
+            print(f"  {r['size']:>10,}  {r['stage']:<32} {r['metric']:<15} "
+                  f"{r['baseline']:.4g} -> {r['current']:.4g}  (x{r['ratio']:.2f})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,10 +12,14 @@ from src.config import (
     STRATEGY_PARAMS,
     MA_SHORT_RANGE,
     MA_LONG_RANGE,
+    GRID_N_JOBS,
+    PROFILE,
+    PROFILE_DIR,
 )
 
 from src.data.loader import load_data
 from src.strategies import apply_strategy
+from src.strategies.context import compute_context
 from src.backtester.engine import BacktestEngine
 from src.backtester.trade_log import generate_trade_log
 from src.backtester.metrics import sharpe_ratio, max_drawdown, volatility
@@ -23,6 +27,7 @@ from src.optimizer.grid_search import grid_search_ma
 from src.plot.equity import plot_equity_and_drawdown
 from src.plot.entry_exit import plot_entry_exit
 from src.utils.helpers import print_section, time_block, ensure_dir
+from src.utils.profiler import span, enable_profiling, disable_profiling
 
 
 # ============================================================
@@ -49,13 +54,19 @@ def run_single_backtest(df_raw, label: str):
     df_bt = engine.run(df_sig)
 
     # 3) Generate trade log
-    trades = generate_trade_log(df_bt)
+    with span("trade_log", rows=len(df_bt)):
+        trades = generate_trade_log(df_bt)
 
     # 4) Print risk metrics
+    with span("metrics", rows=len(df_bt)):
+        sharpe = sharpe_ratio(df_bt, freq=RISK_FREQ)
+        mdd = max_drawdown(df_bt)
+        vol = volatility(df_bt, freq=RISK_FREQ)
+
     print("Risk Metrics:")
-    print(f"  Sharpe Ratio : {sharpe_ratio(df_bt, freq=RISK_FREQ):.4f}")
-    print(f"  Max Drawdown : {max_drawdown(df_bt):.4f}")
-    print(f"  Volatility   : {volatility(df_bt, freq=RISK_FREQ):.4f}")
+    print(f"  Sharpe Ratio : {sharpe:.4f}")
+    print(f"  Max Drawdown : {mdd:.4f}")
+    print(f"  Volatility   : {vol:.4f}")
     print(f"  Total Trades : {len(trades)}")
 
     print("\nSample Trades (first 5):")
@@ -73,17 +84,20 @@ def main():
     # 1. Load raw data
     # --------------------------------------------------------------
     print_section("Loading Data")
-    df_raw = load_data(DATA_PATH)
+    with span("load") as sp:
+        df_raw = load_data(DATA_PATH)
+        sp.rows = len(df_raw)
     print(f"Loaded data from: {DATA_PATH}")
     print(f"Rows: {len(df_raw)}, Columns: {list(df_raw.columns)}")
 
     # --------------------------------------------------------------
     # 2. Baseline backtest using the strategy in config
     # --------------------------------------------------------------
-    df_init, trades_init = run_single_backtest(
-        df_raw,
-        label=f"Baseline ({SYMBOL})",
-    )
+    with span("baseline_backtest", strategy=STRATEGY_NAME):
+        df_init, trades_init = run_single_backtest(
+            df_raw,
+            label=f"Baseline ({SYMBOL})",
+        )
 
     # --------------------------------------------------------------
     # 3. Skip Grid Search if the strategy is not MA
@@ -97,8 +111,9 @@ def main():
         ensure_dir(equity_path)
         ensure_dir(entry_path)
 
-        plot_equity_and_drawdown(df_init, save_path=equity_path)
-        plot_entry_exit(df_init, save_path=entry_path)
+        with span("plots"):
+            plot_equity_and_drawdown(df_init, save_path=equity_path)
+            plot_entry_exit(df_init, save_path=entry_path)
 
         print("Charts saved:")
         print(f"  - {equity_path}")
@@ -118,6 +133,7 @@ def main():
             commission=COMMISSION,
             slippage=SLIPPAGE,
             save_path=f"{CHART_DIR}/heatmap_sharpe.png",
+            n_jobs=GRID_N_JOBS,
         )
 
     print("Grid Search Results:")
@@ -133,21 +149,23 @@ def main():
     # --------------------------------------------------------------
     print_section("Backtest with Best Parameters + Chart Output")
 
-    df_best_sig = apply_strategy(
-        df_raw.copy(),
-        "ma",
-        short_window=int(best["short"]),
-        long_window=int(best["long"])
-    )
+    with span("best_backtest"):
+        df_best_sig = apply_strategy(
+            df_raw.copy(),
+            "ma",
+            short_window=int(best["short"]),
+            long_window=int(best["long"])
+        )
 
-    engine = BacktestEngine(
-        initial_capital=INITIAL_CAPITAL,
-        commission=COMMISSION,
-        slippage=SLIPPAGE,
-    )
-    df_best = engine.run(df_best_sig)
+        engine = BacktestEngine(
+            initial_capital=INITIAL_CAPITAL,
+            commission=COMMISSION,
+            slippage=SLIPPAGE,
+        )
+        df_best = engine.run(df_best_sig)
 
-    trades_best = generate_trade_log(df_best)
+        with span("trade_log", rows=len(df_best)):
+            trades_best = generate_trade_log(df_best)
 
     equity_path = f"{CHART_DIR}/equity_drawdown_best.png"
     entry_path = f"{CHART_DIR}/entry_exit_best.png"
@@ -155,8 +173,9 @@ def main():
     ensure_dir(equity_path)
     ensure_dir(entry_path)
 
-    plot_equity_and_drawdown(df_best, save_path=equity_path)
-    plot_entry_exit(df_best, save_path=entry_path)
+    with span("plots"):
+        plot_equity_and_drawdown(df_best, save_path=equity_path)
+        plot_entry_exit(df_best, save_path=entry_path)
 
     print_section("Completed")
     print("Charts for best-parameter strategy saved:")
@@ -165,5 +184,26 @@ def main():
     print(f"  - Sharpe (best) : {best['sharpe']:.4f}")
 
 
+def _export_profile(prof, name: str):
+    json_path = f"{PROFILE_DIR}/{name}.json"
+    trace_path = f"{PROFILE_DIR}/{name}.trace.json"
+    prof.export_json(json_path)
+    prof.export_chrome_trace(trace_path)
+
+    print_section("Profile")
+    print(prof.report())
+    print(f"\nProfile saved:\n  - {json_path}\n  - {trace_path}")
+
+
 if __name__ == "__main__":
-    main()
+    if PROFILE:
+        enable_profiling()
+
+    # 同一次运行内，meta 策略共用底层信号 / 因子
+    try:
+        with compute_context(), span("run_backtest"):
+            main()
+    finally:
+        prof = disable_profiling()
+        if prof is not None:
+            _export_profile(prof, "run_backtest")
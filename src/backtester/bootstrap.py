@@ -0,0 +1,195 @@
+# src/backtester/bootstrap.py
+"""
+Bootstrap confidence intervals for backtest metrics.
+
+Resamples the net_ret series with a stationary (Politis-Romano) or circular
+block bootstrap, which keeps the short-range autocorrelation of strategy
+returns. Resample indices are generated as one (B, N) matrix per chunk and
+Sharpe / volatility / max drawdown are computed for all B resamples at once.
+Chunks can be sharded across a process pool for very long series.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .metrics import _annualize_factor
+
+BOOTSTRAP_METRICS = ["sharpe", "volatility", "max_drawdown"]
+
+# 每块 (B_chunk, N) 矩阵大约控制在 8M 个元素（float64 约 64MB）
+_CHUNK_ELEMENTS = 8_000_000
+
+
+# ============================================================
+# Resample indices
+# ============================================================
+def bootstrap_indices(
+    n: int,
+    n_resamples: int,
+    method: str = "stationary",
+    block_size: float | None = None,
+    rng=None,
+) -> np.ndarray:
+    """
+    生成 (n_resamples, n) 的重采样行号矩阵。
+
+    :param method: "stationary" — 块长服从均值 block_size 的几何分布；
+                   "block" — 固定长度 block_size 的循环块
+    :param block_size: 平均 / 固定块长，None 时取 n^(1/3)
+    """
+    rng = np.random.default_rng(rng)
+    if block_size is None:
+        block_size = max(1.0, round(n ** (1 / 3)))
+    if block_size < 1:
+        raise ValueError(f"block_size 必须 >= 1，得到 {block_size}")
+
+    if method == "block":
+        length = int(block_size)
+        n_blocks = -(-n // length)
+        starts = rng.integers(0, n, size=(n_resamples, n_blocks))
+        idx = (starts[:, :, None] + np.arange(length)) % n
+        return idx.reshape(n_resamples, -1)[:, :n]
+
+    if method == "stationary":
+        # 每个位置以概率 1/block_size 开始新块（第 0 个位置一定是新块）
+        new_block = rng.random((n_resamples, n)) < 1.0 / block_size
+        new_block[:, 0] = True
+        starts = rng.integers(0, n, size=(n_resamples, n))
+
+        pos = np.arange(n)
+        block_pos = np.where(new_block, pos, 0)
+        np.maximum.accumulate(block_pos, axis=1, out=block_pos)
+
+        # 当前块的起点 + 块内偏移，循环取模
+        idx = np.take_along_axis(starts, block_pos, axis=1)
+        idx += pos - block_pos
+        idx %= n
+        return idx
+
+    raise ValueError(f"未知 bootstrap 方法 '{method}', 可选: stationary, block")
+
+
+# ============================================================
+# Vectorized metrics over rows
+# ============================================================
+def _metrics_rows(R: np.ndarray, ann: float) -> dict:
+    """R: (B, N) 收益矩阵，每行一条重采样路径；与 metrics.py 的定义一致。"""
+    mean = R.mean(axis=1)
+    std = R.std(axis=1, ddof=1)
+
+    sharpe = np.divide(mean, std, out=np.zeros_like(mean), where=std != 0) * np.sqrt(ann)
+    vol = std * np.sqrt(ann)
+
+    equity = np.add(R, 1.0)
+    np.cumprod(equity, axis=1, out=equity)
+    peak = np.maximum.accumulate(equity, axis=1)
+    equity /= peak
+    mdd = equity.min(axis=1) - 1.0
+
+    return {"sharpe": sharpe, "volatility": vol, "max_drawdown": mdd}
+
+
+def _run_chunk(returns, size, seed, method, block_size, ann) -> dict:
+    rng = np.random.default_rng(seed)
+    idx = bootstrap_indices(len(returns), size, method=method, block_size=block_size, rng=rng)
+    return _metrics_rows(returns[idx], ann)
+
+
+# ============================================================
+# Worker：returns 每个进程只传一次
+# ============================================================
+_WORKER_STATE = {}
+
+
+def _init_worker(returns, method, block_size, ann):
+    _WORKER_STATE.update(returns=returns, method=method, block_size=block_size, ann=ann)
+
+
+def _worker_chunk(task) -> dict:
+    size, seed = task
+    st = _WORKER_STATE
+    return _run_chunk(st["returns"], size, seed, st["method"], st["block_size"], st["ann"])
+
+
+def _clean(df_or_returns) -> np.ndarray:
+    if isinstance(df_or_returns, pd.DataFrame):
+        if "net_ret" not in df_or_returns.columns:
+            raise ValueError("DataFrame need net_ret")
+        df_or_returns = df_or_returns["net_ret"]
+
+    r = np.asarray(df_or_returns, dtype=float).ravel()
+    return r[np.isfinite(r)]
+
+
+def bootstrap_metrics(
+    df_or_returns,
+    n_resamples: int = 10_000,
+    method: str = "stationary",
+    block_size: float | None = None,
+    freq: str = "1d",
+    alpha: float = 0.05,
+    seed=None,
+    n_jobs: int = 1,
+    chunk_size: int | None = None,
+    return_samples: bool = False,
+):
+    """
+    对 net_ret 做 bootstrap，返回 Sharpe / volatility / max drawdown 的置信区间。
+
+    :param df_or_returns: 含 net_ret 的回测 DataFrame，或收益序列 / 数组（NaN / inf 会被剔除）
+    :param alpha: 双侧百分位区间 [alpha/2, 1-alpha/2]
+    :param seed: 随机种子；每个 chunk 用 SeedSequence 派生的独立子种子，
+                 结果与 n_jobs 无关
+    :param n_jobs: 进程数；1 = 串行，None / -1 = 全部 CPU
+    :param chunk_size: 每块重采样个数，None 时按 N 自动估计
+    :param return_samples: True 时同时返回每个指标的全部重采样值 (DataFrame)
+    :return: DataFrame，index = 指标名，
+             columns = [estimate, mean, std, ci_lower, ci_upper]
+    """
+    returns = _clean(df_or_returns)
+    n = len(returns)
+    if n < 2:
+        raise ValueError("bootstrap_metrics() 至少需要 2 个有效收益")
+
+    ann = _annualize_factor(freq)
+
+    if chunk_size is None:
+        chunk_size = max(1, _CHUNK_ELEMENTS // n)
+    sizes = [min(chunk_size, n_resamples - s) for s in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(sizes))
+
+    if n_jobs == 1:
+        parts = [
+            _run_chunk(returns, size, s, method, block_size, ann)
+            for size, s in zip(sizes, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(returns, method, block_size, ann),
+        ) as pool:
+            parts = list(pool.map(_worker_chunk, zip(sizes, seeds)))
+
+    samples = pd.DataFrame({
+        m: np.concatenate([p[m] for p in parts]) for m in BOOTSTRAP_METRICS
+    })
+    estimate = _metrics_rows(returns[None, :], ann)
+
+    ci = pd.DataFrame({
+        "estimate": [float(estimate[m][0]) for m in BOOTSTRAP_METRICS],
+        "mean": samples.mean().to_numpy(),
+        "std": samples.std().to_numpy(),
+        "ci_lower": samples.quantile(alpha / 2).to_numpy(),
+        "ci_upper": samples.quantile(1 - alpha / 2).to_numpy(),
+    }, index=BOOTSTRAP_METRICS)
+
+    if return_samples:
+        return ci, samples
+    return ci
@@ -1,3 +1,186 @@
+import numpy as np
+import pandas as pd
+
+from .engine import BacktestEngine
+from .metrics import sharpe_ratio_batch, volatility_batch, max_drawdown_batch
+
+
+# ============================================================
+# 可插拔成本模型
+# ============================================================
+# 统一接口：model(trade, bars, capital) -> (commission_cost, slippage_cost)
+#   trade   : (N, M) 换仓量 |Δsignal|（占资金比例）
+#   bars    : {"Close" / "High" / "Low" / "Volume": (N, 1) 或 (N, M) 数组}，只含 df 里有的列
+#   capital : 用来把换仓量换成金额 / 股数的资金。默认是上一根 bar 收盘的净值，
+#             (N, 1) 或 (N, M) 数组，随复利增长（见 BacktestEngine._model_costs）；
+#             BacktestEngine(compound_costs=False) 时是固定的标量 initial_capital。
+#             模型只能对它做逐元素运算。
+# 返回的两个 (N, M) 数组都是“占资金比例”的成本，直接从收益里扣，
+# 与 BacktestEngine 的 commission_cost / slippage_cost 列含义相同。
+# 模型可以用 + 组合：FlatCost(...) + SquareRootImpact(...)。
+
+class CostModel:
+    required = ()
+
+    def __call__(self, trade, bars, capital):
+        missing = [c for c in self.required if c not in bars]
+        if missing:
+            raise ValueError(f"{type(self).__name__} 需要行情列: {missing}")
+        commission, slippage = self.compute(trade, bars, capital)
+        zero = np.zeros(trade.shape)
+        return (
+            zero + commission if commission is not None else zero,
+            zero + slippage if slippage is not None else zero,
+        )
+
+    def compute(self, trade, bars, capital):
+        raise NotImplementedError
+
+    def __add__(self, other):
+        return CompositeCost(self, other)
+
+
+class CompositeCost(CostModel):
+    """多个模型的成本分别相加（commission 归 commission，slippage 归 slippage）。"""
+
+    def __init__(self, *models):
+        flat = []
+        for m in models:
+            flat.extend(m.models if isinstance(m, CompositeCost) else [m])
+        self.models = flat
+
+    def compute(self, trade, bars, capital):
+        commission = np.zeros(trade.shape)
+        slippage = np.zeros(trade.shape)
+        for m in self.models:
+            c, s = m(trade, bars, capital)
+            commission += c
+            slippage += s
+        return commission, slippage
+
+
+class FlatCost(CostModel):
+    """与引擎默认相同：每单位换仓固定比例的手续费 + 滑点。"""
+
+    def __init__(self, commission: float = 0.0005, slippage: float = 0.0002):
+        self.commission = float(commission)
+        self.slippage = float(slippage)
+
+    def compute(self, trade, bars, capital):
+        return trade * self.commission, trade * self.slippage
+
+
+class TieredCommission(CostModel):
+    """
+    按单笔成交金额分档的手续费率，可设单笔最低手续费。
+    :param tiers: [(金额下限, 费率), ...]，如 [(0, 0.001), (1e5, 0.0005), (1e6, 0.0002)]
+    :param min_fee: 每笔（换仓量 > 0 的 bar）最低手续费（金额）
+    """
+
+    def __init__(self, tiers, min_fee: float = 0.0):
+        tiers = sorted((float(t), float(r)) for t, r in tiers)
+        if not tiers:
+            raise ValueError("TieredCommission 至少需要一档费率")
+        self.thresholds = np.array([t for t, _ in tiers])
+        self.rates = np.array([r for _, r in tiers])
+        self.min_fee = float(min_fee)
+
+    def compute(self, trade, bars, capital):
+        notional = trade * capital
+        tier = np.searchsorted(self.thresholds, notional, side="right") - 1
+        rate = self.rates[np.clip(tier, 0, None)]
+        fee = np.where(trade > 0, np.maximum(notional * rate, self.min_fee), 0.0)
+        return fee / capital, None
+
+
+def _participation(trade, bars, capital, max_participation):
+    """成交股数 / bar 成交量；成交量为 0 或缺失时按 max_participation 计。"""
+    shares = trade * capital / bars["Close"]
+    volume = bars["Volume"]
+    part = np.divide(
+        shares, volume,
+        out=np.full(np.broadcast(shares, volume).shape, float(max_participation)),
+        where=volume > 0,
+    )
+    return np.minimum(part, max_participation)
+
+
+class ParticipationSlippage(CostModel):
+    """
+    滑点与参与率成正比：slippage = coef * (成交股数 / bar Volume)，每单位换仓。
+    :param max_participation: 参与率上限（也用于成交量为 0 的 bar）
+    """
+    required = ("Close", "Volume")
+
+    def __init__(self, coef: float = 0.1, max_participation: float = 1.0):
+        self.coef = float(coef)
+        self.max_participation = float(max_participation)
+
+    def compute(self, trade, bars, capital):
+        part = _participation(trade, bars, capital, self.max_participation)
+        return None, trade * self.coef * part
+
+
+class SquareRootImpact(CostModel):
+    """
+    平方根冲击：impact = coef * sigma * sqrt(参与率)，每单位换仓。
+    sigma 为过去 vol_window 根 bar 收益的滚动 std（只用当前及之前的 bar，
+    开头不足一个窗口时用已有的数据，只有一根 bar 时为 0）。
+    """
+    required = ("Close", "Volume")
+
+    def __init__(self, coef: float = 1.0, vol_window: int = 20, max_participation: float = 1.0):
+        self.coef = float(coef)
+        self.vol_window = int(vol_window)
+        self.max_participation = float(max_participation)
+
+    def compute(self, trade, bars, capital):
+        close = pd.DataFrame(bars["Close"])
+        sigma = close.pct_change().rolling(self.vol_window, min_periods=2).std()
+        sigma = sigma.fillna(0.0).to_numpy()
+
+        part = _participation(trade, bars, capital, self.max_participation)
+        return None, trade * self.coef * sigma * np.sqrt(part)
+
+
+class HighLowSpread(CostModel):
+    """
+    Corwin-Schultz (2012) 高低价价差估计，用 t-1 / t 两根 bar 的 High / Low；
+    每单位换仓付半个价差。负估计记 0，window > 1 时对估计值做滚动平均。
+    """
+    required = ("High", "Low")
+
+    _K = 3.0 - 2.0 * np.sqrt(2.0)
+
+    def __init__(self, window: int = 1, scale: float = 0.5):
+        self.window = int(window)
+        self.scale = float(scale)
+
+    def spread(self, high, low) -> np.ndarray:
+        hl = np.log(high / low) ** 2
+        beta = np.zeros(hl.shape)
+        beta[1:] = hl[1:] + hl[:-1]
+
+        gamma = np.zeros(hl.shape)
+        h2 = np.maximum(high[1:], high[:-1])
+        l2 = np.minimum(low[1:], low[:-1])
+        gamma[1:] = np.log(h2 / l2) ** 2
+
+        with np.errstate(invalid="ignore"):
+            alpha = (np.sqrt(2.0 * beta) - np.sqrt(beta)) / self._K - np.sqrt(gamma / self._K)
+        s = 2.0 * (np.exp(alpha) - 1.0) / (1.0 + np.exp(alpha))
+        s = np.where(np.isfinite(s) & (s > 0), s, 0.0)
+        s[0] = 0.0
+
+        if self.window > 1:
+            s = pd.DataFrame(s).rolling(self.window, min_periods=1).mean().to_numpy()
+        return s
+
+    def compute(self, trade, bars, capital):
+        s = self.spread(bars["High"], bars["Low"])
+        return None, trade * self.scale * s
+
+
 def cost_analysis(df):
     return {
         "total_cost": df["cost"].sum(),
@@ -5,3 +188,70 @@ def cost_analysis(df):
         "slippage": df["slippage_cost"].sum(),
         "trades": int(df["trade_flag"].sum()),
     }
+
+
+# ============================================================
+# 成本敏感性：毛收益 / 换手只算一次，K 组成本假设一次向量化评估
+# ============================================================
+def cost_sensitivity(
+    df: pd.DataFrame,
+    commission,
+    slippage,
+    initial_capital: float = 10_000.0,
+    freq: str = "1d",
+    return_equity: bool = False,
+) -> dict:
+    """
+    对同一条 signal 评估 K 组 (commission, slippage)。
+
+    :param df: 至少包含 ['Close', 'signal'] 的 DataFrame（策略输出）
+    :param commission / slippage: 标量或长度 K 的数组，两者广播成 K 组成本；
+                                  稠密网格可以先用 np.meshgrid 展开再 ravel
+    :param return_equity: True 时附带 (N, K) 净值矩阵
+    :return: dict：
+             "metrics"    : DataFrame，每行一组成本：
+                            commission / slippage / sharpe / volatility / max_drawdown /
+                            total_return / total_cost
+             "break_even" : 单位换手总成本 k* = Σ strategy_ret / Σ trade_flag，
+                            commission + slippage = k* 时平均净收益（即 Sharpe）为 0
+             "turnover"   : Σ trade_flag
+             "equity"     : (N, K) 净值矩阵（return_equity=True 时）
+    """
+    commission, slippage = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(commission, dtype=float)),
+        np.atleast_1d(np.asarray(slippage, dtype=float)),
+    )
+    if commission.ndim != 1:
+        raise ValueError("cost_sensitivity() commission / slippage 需要是标量或 1-D 数组")
+
+    # 零成本跑一次：得到毛收益和换手（与 engine.run 相同的 position / trade_flag 语义）
+    engine = BacktestEngine(initial_capital=initial_capital, commission=0.0, slippage=0.0)
+    gross = engine.run(df, columns=["strategy_ret", "trade_flag"])
+    strategy_ret = gross["strategy_ret"].to_numpy()[:, None]
+    trade_flag = gross["trade_flag"].to_numpy()[:, None]
+
+    # 与 BacktestEngine 相同的运算顺序：cost = tf * commission + tf * slippage
+    cost = trade_flag * commission + trade_flag * slippage
+    net_ret = strategy_ret - cost
+
+    equity = np.add(net_ret, 1.0)
+    np.cumprod(equity, axis=0, out=equity)
+    equity *= initial_capital
+
+    turnover = float(trade_flag.sum())
+    break_even = float(strategy_ret.sum() / turnover) if turnover > 0 else np.nan
+
+    metrics = pd.DataFrame({
+        "commission": commission,
+        "slippage": slippage,
+        "sharpe": sharpe_ratio_batch(net_ret, freq=freq),
+        "volatility": volatility_batch(net_ret, freq=freq),
+        "max_drawdown": max_drawdown_batch(equity),
+        "total_return": equity[-1] / initial_capital - 1.0 if len(equity) else 0.0,
+        "total_cost": cost.sum(axis=0),
+    })
+
+    out = {"metrics": metrics, "break_even": break_even, "turnover": turnover}
+    if return_equity:
+        out["equity"] = equity
+    return out
@@ -1,6 +1,27 @@
 import pandas as pd
 import numpy as np
 
+from src.utils.profiler import span
+
+# 成本模型可以用到的行情列（见 src/backtester/cost.py）
+BAR_COLUMNS = ["Close", "High", "Low", "Volume"]
+
+# compound_costs 时求解 capital 的最大迭代轮数
+_COST_MAX_ITER = 20
+
+# run() / run_batch() 产出的结果列
+RESULT_COLUMNS = [
+    "position",
+    "price_ret",
+    "strategy_ret",
+    "trade_flag",
+    "commission_cost",
+    "slippage_cost",
+    "cost",
+    "net_ret",
+    "equity",
+]
+
 
 class BacktestEngine:
 
@@ -9,10 +30,16 @@ class BacktestEngine:
         initial_capital: float = 10_000.0, #Initial_capital
         commission: float = 0.0005,        #Commission
         slippage: float = 0.0002,          #Slippage
+        cost_model=None,                   #CostModel，None 时用 commission / slippage 固定比例
+        sizer=None,                        #仓位 sizing（如 sizing.VolTargetSizer），None 时 signal 即仓位
+        compound_costs: bool = True,       #cost_model 按上一根 bar 的净值计算成交金额；False 时固定用 initial_capital
     ):
         self.initial_capital = float(initial_capital)
         self.commission = float(commission)
         self.slippage = float(slippage)
+        self.cost_model = cost_model
+        self.sizer = sizer
+        self.compound_costs = bool(compound_costs)
 
     def _validate_input(self, df: pd.DataFrame) -> None:
         required = ["Close", "signal"]
@@ -28,6 +55,18 @@ class BacktestEngine:
         else:
             df = df.sort_index().reset_index(drop=True)
 
+        if self.sizer is not None:
+            # signal 替换成 sizing 后的仓位目标，换仓成本按 sizing 后的变化计算
+            kwargs = {"vol": _frame_vol(df, self.sizer)}
+            if "exit_price" in df.columns:
+                # 出场 bar 整根按成交价平仓，sizing 后也必须归零
+                kwargs["flat"] = df["exit_price"].notna().to_numpy()[:, None]
+            df["signal"] = self.sizer(
+                df["signal"].to_numpy()[:, None],
+                df["Close"].to_numpy(dtype=float)[:, None],
+                **kwargs,
+            )[:, 0]
+
         df["position"] = df["signal"].shift(1).fillna(0.0)
 
         return df
@@ -35,6 +74,12 @@ class BacktestEngine:
     def _compute_returns(self, df: pd.DataFrame) -> pd.DataFrame:
         df["price_ret"] = df["Close"].pct_change().fillna(0.0)
         df["strategy_ret"] = df["position"] * df["price_ret"]
+
+        if "exit_price" in df.columns:
+            # 盘中止损 / 止盈出场的 bar（见 exits.py）：持仓收益只算到成交价
+            fill = df["exit_price"]
+            exit_ret = fill / df["Close"].shift(1) - 1.0
+            df["strategy_ret"] = df["strategy_ret"].where(exit_ret.isna(), df["position"] * exit_ret)
         return df
 
     def _compute_costs(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -45,9 +90,20 @@ class BacktestEngine:
         - slippage_cost: 滑点
         - cost: 总成本（commission + slippage）
         这里用“单位名义资金比例成本”，直接从收益里扣。
+        设置了 cost_model 时，commission_cost / slippage_cost 由模型按 df 的行情列计算。
         """
         df["trade_flag"] = df["signal"].diff().abs().fillna(0.0)
 
+        if self.cost_model is not None:
+            commission_cost, slippage_cost = self._model_costs(
+                df["trade_flag"].to_numpy(dtype=float)[:, None],
+                _bars_from_frame(df),
+                df["strategy_ret"].to_numpy(dtype=float)[:, None],
+            )
+            df["commission_cost"] = commission_cost[:, 0]
+            df["slippage_cost"] = slippage_cost[:, 0]
+            df["cost"] = df["commission_cost"] + df["slippage_cost"]
+            return df
 
         df["commission_cost"] = df["trade_flag"] * self.commission
         df["slippage_cost"] = df["trade_flag"] * self.slippage
@@ -65,26 +121,337 @@ class BacktestEngine:
         df["equity"] = self.initial_capital * (1.0 + df["net_ret"]).cumprod()
         return df
 
+    def _model_costs(self, trade, bars, strategy_ret):
+        """
+        调用 cost_model。compound_costs 时 capital 是上一根 bar 收盘的净值 (N, M)：
+        先用不含成本的净值起步，再用算出的成本更新净值，直到 capital 不再变化
+        （第 t 根的 capital 只依赖 t 之前的成本，成本相对收益很小，通常 2~3 轮收敛）。
+        """
+        if not self.compound_costs:
+            return self.cost_model(trade, bars, self.initial_capital)
+
+        def capital_from(net_ret):
+            cap = np.empty(np.broadcast(net_ret, trade).shape)
+            cap[0] = 1.0
+            np.cumprod(1.0 + net_ret[:-1], axis=0, out=cap[1:])
+            cap *= self.initial_capital
+            return cap
+
+        capital = capital_from(strategy_ret)
+        for _ in range(_COST_MAX_ITER):
+            commission, slippage = self.cost_model(trade, bars, capital)
+            updated = capital_from(strategy_ret - commission - slippage)
+            converged = np.allclose(updated, capital, rtol=1e-12, atol=0.0)
+            capital = updated
+            if converged:
+                break
+        return commission, slippage
+
     # ==============================
     # 对外主接口
     # ==============================
 
-    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+    def run(self, df: pd.DataFrame, columns=None, dtype=None) -> pd.DataFrame:
         """
         运行完整回测流程。
         :param df: 至少包含 ['Close', 'signal'] 的 DataFrame
+        :param columns: None 且 dtype 为 None 时保持原行为；
+                        否则走 lean 模式（见 _run_lean），只返回 columns 中的列
+                        （默认 RESULT_COLUMNS，也可以包含 df 的输入列，如 "Close" / "signal"）
+        :param dtype: lean 模式下结果列的 dtype，如 np.float32
         :return: 附加回测结果列后的 DataFrame（原 df 的 copy，不会改原数据）
         """
         self._validate_input(df)
 
-        df = df.copy()
-        df = self._prepare_signal_and_position(df)
-        df = self._compute_returns(df)
-        df = self._compute_costs(df)
-        df = self._compute_equity(df)
+        if columns is not None or dtype is not None:
+            with span("engine.run", rows=len(df), lean=True):
+                return self._run_lean(df, columns, dtype)
+
+        with span("engine.run", rows=len(df)):
+            df = df.copy()
+            df = self._prepare_signal_and_position(df)
+            df = self._compute_returns(df)
+            df = self._compute_costs(df)
+            df = self._compute_equity(df)
 
         return df
 
+    def _run_lean(self, df: pd.DataFrame, columns, dtype) -> pd.DataFrame:
+        """
+        Lean 模式：不 copy 整个 df（参数扫描时 df 往往带着几十列因子），
+        只取 Close / signal 两列走 run_batch，结果只保留需要的列。
+        数值与原模式相同；保留原时间索引（不 reset_index），
+        只有输入未排序时才按 Date 列 / 索引重排这几列。
+        """
+        columns = list(RESULT_COLUMNS) if columns is None else list(columns)
+        dtype = np.float64 if dtype is None else np.dtype(dtype)
+
+        unknown = [c for c in columns if c not in RESULT_COLUMNS and c not in df.columns]
+        if unknown:
+            raise ValueError(f"BacktestEngine.run() 未知的输出列: {unknown}")
+
+        keys = df["Date"] if "Date" in df.columns else df.index
+        order = None
+        if not keys.is_monotonic_increasing:
+            order = np.argsort(np.asarray(keys), kind="stable")
+
+        def take(values):
+            return values if order is None else values[order]
+
+        bars = None
+        if self.cost_model is not None:
+            bars = {c: take(v) for c, v in _bars_from_frame(df).items()}
+
+        exit_price = None
+        if "exit_price" in df.columns:
+            exit_price = take(df["exit_price"].to_numpy(dtype=float))
+
+        vol = _frame_vol(df, self.sizer) if self.sizer is not None else None
+        if vol is not None:
+            vol = take(vol)
+
+        res = self.run_batch(
+            take(df["Close"].to_numpy(dtype=float)),
+            take(df["signal"].to_numpy(dtype=float)),
+            dtype=dtype,
+            bars=bars,
+            exit_price=exit_price,
+            vol=vol,
+        )
+
+        out = {}
+        for c in columns:
+            out[c] = res[c][:, 0] if c in RESULT_COLUMNS else take(df[c].to_numpy())
+
+        return pd.DataFrame(out, index=take(df.index), columns=columns, copy=False)
+
+    # ==============================
+    # 批量接口：同一价格序列 × M 组信号
+    # ==============================
+
+    def run_batch(self, close, signals, dtype=np.float64, bars=None, exit_price=None, vol=None) -> dict:
+        """
+        一次向量化跑完 M 组信号（参数扫描用），不做任何 DataFrame copy / sort。
+        :param close: 收盘价 (N,)，Series 或 ndarray，所有信号共用；
+                      也可以是 (N, M)（多标的 panel，每列一个标的）
+        :param signals: 信号矩阵 (N, M)，DataFrame 或 ndarray；1-D 视为 M=1
+        :param dtype: 计算 / 输出的浮点类型，np.float32 可以把内存减半
+        :param bars: cost_model 用的行情列 {"High" / "Low" / "Volume": (N,) 或 (N, M)}，
+                     行与 close 对齐；Close 不用传
+        :param exit_price: (N,) 或 (N, M) 盘中出场成交价（exits.exit_overlay 的输出），
+                           非 NaN 的 bar 持仓收益按 exit_price / 上一根 Close - 1 计算，
+                           设置了 sizer 时这些 bar 的仓位目标强制为 0（见 sizer 的 flat 参数）
+        :param vol: (N,) 或 (N, M) 传给 sizer 的波动率（如 vol20 列），None 时 sizer 自己从 close 估计
+        :return: dict，每个 key 都是 (N, M) 数组（dtype 同上）：
+                 position / price_ret / strategy_ret / trade_flag /
+                 commission_cost / slippage_cost / cost / net_ret / equity
+                 （close 为 1-D 时 price_ret 各列相同，广播成 (N, M) 方便直接用）
+        """
+        close, sig, order = _as_batch_arrays(close, signals, dtype)
+        n, m = sig.shape
+
+        # signal.fillna(0)
+        sig[np.isnan(sig)] = 0.0
+
+        fill = None
+        if exit_price is not None:
+            fill = _align_rows(exit_price, n, order, "exit_price").astype(dtype, copy=False)
+            if fill.shape[1] not in (1, m):
+                raise ValueError(f"run_batch() exit_price 需要是 (N,) 或 (N, M)，得到 {fill.shape} vs {(n, m)}")
+
+        if self.sizer is not None:
+            kwargs = {}
+            if vol is not None:
+                kwargs["vol"] = _align_rows(vol, n, order, "vol")
+            if fill is not None:
+                # 出场 bar 整根按成交价平仓，sizing 后也必须归零
+                kwargs["flat"] = ~np.isnan(fill)
+            sig = np.asarray(self.sizer(sig, close, **kwargs), dtype=dtype)
+
+        # position = signal.shift(1).fillna(0)
+        position = np.zeros((n, m), dtype=dtype)
+        position[1:] = sig[:-1]
+
+        # price_ret = Close.pct_change().fillna(0)，close 统一成 (N, 1) 或 (N, M)
+        price_ret = np.zeros(close.shape, dtype=dtype)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_ret[1:] = close[1:] / close[:-1] - 1.0
+        price_ret[np.isnan(price_ret)] = 0.0
+
+        strategy_ret = position * price_ret
+
+        if fill is not None:
+            exit_ret = np.full(fill.shape, np.nan, dtype=dtype)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                exit_ret[1:] = fill[1:] / close[:-1] - 1.0
+            hit = ~np.isnan(exit_ret)
+            strategy_ret = np.where(hit, position * exit_ret, strategy_ret)
+
+        # trade_flag = |signal.diff()|.fillna(0)
+        trade_flag = np.zeros((n, m), dtype=dtype)
+        np.subtract(sig[1:], sig[:-1], out=trade_flag[1:])
+        np.abs(trade_flag, out=trade_flag)
+
+        if self.cost_model is None:
+            commission_cost = trade_flag * self.commission
+            slippage_cost = trade_flag * self.slippage
+        else:
+            bars = _as_bar_arrays(bars, close, order)
+            commission_cost, slippage_cost = self._model_costs(trade_flag, bars, strategy_ret)
+            commission_cost = commission_cost.astype(dtype, copy=False)
+            slippage_cost = slippage_cost.astype(dtype, copy=False)
+        cost = commission_cost + slippage_cost
+
+        net_ret = strategy_ret - cost
+        equity = np.add(net_ret, 1.0)
+        np.cumprod(equity, axis=0, out=equity)
+        equity *= self.initial_capital
+
+        return {
+            "position": position,
+            "price_ret": np.broadcast_to(price_ret, (n, m)),
+            "strategy_ret": strategy_ret,
+            "trade_flag": trade_flag,
+            "commission_cost": commission_cost,
+            "slippage_cost": slippage_cost,
+            "cost": cost,
+            "net_ret": net_ret,
+            "equity": equity,
+        }
+
+    def run_panel(self, close: pd.DataFrame, signal: pd.DataFrame, bars=None) -> dict:
+        """
+        多标的 panel 回测：close / signal 都是 (time × symbol) 的 DataFrame。
+        每个标的各自按 initial_capital 计算净值；组合净值按当期有价格的标的等权
+        （每根 bar 再平衡）。
+        :param bars: cost_model 用的行情 panel {"High" / "Low" / "Volume": (time × symbol) DataFrame}，
+                     如 load_panel 的输出；按 close 的时间 / symbol 对齐，价格列同样前向填充
+        :return: dict：
+                 "net_ret" / "equity" / "position" / "cost" : (time × symbol) DataFrame
+                 "portfolio" : DataFrame[["net_ret", "equity"]] 组合层面
+        """
+        if not close.columns.equals(signal.columns):
+            raise ValueError("run_panel() close / signal 的 symbol 列不一致")
+        signal = signal.reindex(close.index)
+
+        if not close.index.is_monotonic_increasing:
+            close = close.sort_index()
+            signal = signal.loc[close.index]
+
+        if bars is not None:
+            bars = {
+                c: _align_panel(bars[c], close, fill=c != "Volume")
+                for c in BAR_COLUMNS if c in bars and c != "Close"
+            }
+
+        # 中间缺失的 bar 用上一价格补齐，跨缺口的收益记到下一根有价格的 bar
+        res = self.run_batch(
+            close.ffill().to_numpy(dtype=float),
+            signal.to_numpy(dtype=float),
+            bars=bars,
+        )
+
+        def frame(arr):
+            return pd.DataFrame(arr, index=close.index, columns=close.columns)
+
+        # 组合：当期有价格的标的等权
+        listed = close.notna().to_numpy()
+        n_listed = listed.sum(axis=1)
+        port_ret = np.divide(
+            (res["net_ret"] * listed).sum(axis=1),
+            n_listed,
+            out=np.zeros(len(close)),
+            where=n_listed > 0,
+        )
+        portfolio = pd.DataFrame({"net_ret": port_ret}, index=close.index)
+        portfolio["equity"] = self.initial_capital * np.cumprod(1.0 + port_ret)
+
+        return {
+            "net_ret": frame(res["net_ret"]),
+            "equity": frame(res["equity"]),
+            "position": frame(res["position"]),
+            "cost": frame(res["cost"]),
+            "portfolio": portfolio,
+        }
+
+
+def _as_batch_arrays(close, signals, dtype=np.float64):
+    """
+    把 close / signals 转成 dtype 的 (N, 1) 或 (N, M) / (N, M) 数组。
+    close 是索引乱序的 Series / DataFrame 时，按时间索引排序（signals 按行与 close 对齐）。
+    """
+    sig = np.array(signals, dtype=dtype)   # 总是 copy，后面会原地改
+    if sig.ndim == 1:
+        sig = sig[:, None]
+    if sig.ndim != 2:
+        raise ValueError(f"run_batch() signals 需要是 (N, M)，得到 shape={sig.shape}")
+
+    order = None
+    if isinstance(close, (pd.Series, pd.DataFrame)) and not close.index.is_monotonic_increasing:
+        order = np.argsort(close.index.values, kind="stable")
+
+    close = np.asarray(close, dtype=dtype)
+    if close.ndim == 1:
+        close = close[:, None]
+    elif close.ndim != 2 or close.shape[1] != sig.shape[1]:
+        raise ValueError(
+            f"run_batch() close 需要是 (N,) 或与 signals 同形状，得到 {close.shape} vs {sig.shape}"
+        )
+    if len(close) != len(sig):
+        raise ValueError(
+            f"run_batch() close / signals 长度不一致: {len(close)} vs {len(sig)}"
+        )
+
+    if order is not None:
+        close = close[order]
+        sig = sig[order]
+
+    return close, sig, order
+
+
+def _align_rows(values, n: int, order, name: str) -> np.ndarray:
+    """run_batch 的附加输入 -> float64 (N, 1) / (N, k) 数组，行顺序与排序后的 close 一致。"""
+    v = np.asarray(values, dtype=float)
+    if v.ndim == 1:
+        v = v[:, None]
+    if v.ndim != 2 or len(v) != n:
+        raise ValueError(f"run_batch() {name} 需要是 (N,) 或 (N, M)，得到 {v.shape}，N={n}")
+    return v if order is None else v[order]
+
+
+def _align_panel(wide: pd.DataFrame, close: pd.DataFrame, fill: bool) -> np.ndarray:
+    """run_panel 的行情 panel -> 与 close 同时间 / 同 symbol 顺序的 (N, M) 数组。"""
+    missing = [c for c in close.columns if c not in wide.columns]
+    if missing:
+        raise ValueError(f"run_panel() bars 缺少 symbol: {missing}")
+    wide = wide.reindex(index=close.index, columns=close.columns)
+    if fill:
+        wide = wide.ffill()
+    return wide.to_numpy(dtype=float)
+
+
+def _frame_vol(df: pd.DataFrame, sizer):
+    """sizer 声明的波动率列（如 vol20）在 df 里时取出来复用，否则返回 None。"""
+    col = getattr(sizer, "vol_column", None)
+    if col is None or col not in df.columns:
+        return None
+    return df[col].to_numpy(dtype=float)[:, None]
+
+
+def _bars_from_frame(df: pd.DataFrame) -> dict:
+    """df 中成本模型用得到的行情列 -> {列名: (N, 1) float 数组}。"""
+    return {c: df[c].to_numpy(dtype=float)[:, None] for c in BAR_COLUMNS if c in df.columns}
+
+
+def _as_bar_arrays(bars, close, order) -> dict:
+    """
+    成本模型的行情输入统一成 float64 的 (N, 1) / (N, M) 数组，
+    行顺序与 _as_batch_arrays 排序后的 close 一致；Close 直接用 close。
+    """
+    out = {c: _align_rows(v, len(close), order, f"bars['{c}']") for c, v in (bars or {}).items()}
+    out["Close"] = np.asarray(close, dtype=float)
+    return out
+
 
 # =========================================
 # 方便调用的函数式封装（保持你原来的习惯）
@@ -105,3 +472,21 @@ def run_backtest(
         slippage=slippage,
     )
     return engine.run(df)
+
+
+def run_backtest_batch(
+    close,
+    signals,
+    initial_capital: float = 10_000.0,
+    commission: float = 0.0005,
+    slippage: float = 0.0002,
+) -> dict:
+    """
+    快捷函数：BacktestEngine.run_batch 的函数式版本。
+    """
+    engine = BacktestEngine(
+        initial_capital=initial_capital,
+        commission=commission,
+        slippage=slippage,
+    )
+    return engine.run_batch(close, signals)
@@ -0,0 +1,257 @@
+# src/backtester/exits.py
+"""
+Exit overlay: path-dependent stop-loss / take-profit / trailing-stop / time-stop.
+
+Sits between the strategy and the engine. It walks the strategy signal bar by
+bar and checks each bar's High / Low against the levels of the trade that is
+open during that bar (entry = Close of the bar the entry signal was issued on,
+i.e. the price BacktestEngine starts earning from). When a level is hit:
+
+  - the signal is set to 0 on that bar (position goes flat on the next bar);
+  - exit_price holds the fill (the level, or Open if the bar gapped through it),
+    and the engine books that bar's return up to exit_price instead of Close;
+  - re-entry is blocked while the raw signal keeps the exited direction, so a
+    stopped-out trade is re-opened only after the strategy changes direction.
+
+The loop is compiled with numba when it is installed, otherwise it runs the
+same code as plain Python (identical results, much slower).
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.jit import njit
+
+
+# exit_reason 编码
+EXIT_NONE = 0
+EXIT_STOP_LOSS = 1
+EXIT_TAKE_PROFIT = 2
+EXIT_TRAILING = 3
+EXIT_TIME = 4
+
+EXIT_REASONS = {
+    EXIT_STOP_LOSS: "stop_loss",
+    EXIT_TAKE_PROFIT: "take_profit",
+    EXIT_TRAILING: "trailing_stop",
+    EXIT_TIME: "time_stop",
+}
+
+
+# ============================================================
+# Kernel
+# ============================================================
+@njit(cache=True, nogil=True)
+def _exit_kernel(sig, open_, high, low, close, stop_loss, take_profit, trailing, max_bars,
+                 out_sig, out_price, out_reason):
+    """
+    sig: (N, M)；open_ / high / low / close: (N,)；参数: (M,)，<= 0 或 NaN 表示不启用。
+    结果写进 out_sig / out_price / out_reason（都是 (N, M)，out_price 预先填 NaN）。
+    同一根 bar 止损和止盈都触发时按止损算（无法知道盘中先后，取保守的一边）。
+    """
+    n, m = sig.shape
+    for j in range(m):
+        sl = stop_loss[j]
+        tp = take_profit[j]
+        tr = trailing[j]
+        tb = max_bars[j]
+
+        direction = 0      # 当前持仓方向（out_sig 的符号）
+        blocked = 0        # 被出场的方向：raw 保持该方向时不再进场
+        entry = 0.0
+        peak = 0.0         # 多头：入场以来最高价；空头：最低价
+        entry_bar = 0
+
+        for t in range(n):
+            raw = sig[t, j]
+            if raw != raw:
+                raw = 0.0
+            s = 1 if raw > 0 else (-1 if raw < 0 else 0)
+
+            # ---------- 1) 盘中：检查上一根 bar 留下的持仓 ----------
+            if direction != 0:
+                hit = EXIT_NONE
+                fill = np.nan
+                if direction > 0:
+                    stop = -np.inf
+                    reason = EXIT_STOP_LOSS
+                    if sl > 0:
+                        stop = entry * (1.0 - sl)
+                    if tr > 0 and peak * (1.0 - tr) > stop:
+                        stop = peak * (1.0 - tr)
+                        reason = EXIT_TRAILING
+                    if low[t] <= stop:
+                        hit = reason
+                        fill = stop
+                        if open_[t] < stop:
+                            fill = open_[t]
+                    elif tp > 0 and high[t] >= entry * (1.0 + tp):
+                        hit = EXIT_TAKE_PROFIT
+                        fill = entry * (1.0 + tp)
+                        if open_[t] > fill:
+                            fill = open_[t]
+                else:
+                    stop = np.inf
+                    reason = EXIT_STOP_LOSS
+                    if sl > 0:
+                        stop = entry * (1.0 + sl)
+                    if tr > 0 and peak * (1.0 + tr) < stop:
+                        stop = peak * (1.0 + tr)
+                        reason = EXIT_TRAILING
+                    if high[t] >= stop:
+                        hit = reason
+                        fill = stop
+                        if open_[t] > stop:
+                            fill = open_[t]
+                    elif tp > 0 and low[t] <= entry * (1.0 - tp):
+                        hit = EXIT_TAKE_PROFIT
+                        fill = entry * (1.0 - tp)
+                        if open_[t] < fill:
+                            fill = open_[t]
+
+                if hit == EXIT_NONE and tb > 0 and t - entry_bar >= tb:
+                    hit = EXIT_TIME
+                    fill = close[t]
+
+                if hit != EXIT_NONE:
+                    out_price[t, j] = fill
+                    out_reason[t, j] = hit
+                    blocked = direction
+                    direction = 0
+                elif direction > 0:
+                    if high[t] > peak:
+                        peak = high[t]
+                else:
+                    if low[t] < peak:
+                        peak = low[t]
+
+            # ---------- 2) 收盘：跟随策略信号 ----------
+            if blocked != 0:
+                if s == blocked:
+                    out_sig[t, j] = 0.0
+                    continue
+                blocked = 0
+
+            if s == 0:
+                direction = 0
+                out_sig[t, j] = 0.0
+            elif s == direction:
+                out_sig[t, j] = raw
+            else:
+                direction = s
+                entry = close[t]
+                peak = close[t]
+                entry_bar = t
+                out_sig[t, j] = raw
+
+
+# ============================================================
+# Public API
+# ============================================================
+def _param_array(value, m: int, name: str, dtype=float) -> np.ndarray:
+    """标量 / 长度 M 的参数 -> (M,) 数组；None 表示不启用（填 0）。"""
+    if value is None:
+        return np.zeros(m, dtype=dtype)
+    arr = np.atleast_1d(np.asarray(value, dtype=float))
+    if arr.ndim != 1 or len(arr) not in (1, m):
+        raise ValueError(f"exit_overlay() {name} 需要是标量或长度 {m} 的数组，得到 shape={arr.shape}")
+    arr = np.nan_to_num(np.broadcast_to(arr, (m,)), nan=0.0)
+    return np.ascontiguousarray(arr, dtype=dtype)
+
+
+def _price(values, n: int, name: str) -> np.ndarray:
+    arr = np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+    if arr.shape != (n,):
+        raise ValueError(f"exit_overlay() {name} 需要是长度 {n} 的 1-D 序列，得到 shape={arr.shape}")
+    return arr
+
+
+def exit_overlay(
+    signal,
+    high,
+    low,
+    close,
+    open_=None,
+    stop_loss=None,
+    take_profit=None,
+    trailing_stop=None,
+    max_bars=None,
+) -> dict:
+    """
+    对 M 组信号 / 参数一次跑完出场叠加。
+
+    :param signal: (N,) 或 (N, M) 策略信号（-1/0/1 或连续权重，按符号判断方向）
+    :param high / low / close: (N,) 价格序列，所有列共用
+    :param open_: (N,) 开盘价，用于跳空穿过止损 / 止盈位时按开盘价成交；None 时只按触发价成交
+    :param stop_loss: 相对入场价的止损比例，如 0.02
+    :param take_profit: 相对入场价的止盈比例
+    :param trailing_stop: 相对入场以来最高价（空头为最低价）的回撤比例
+    :param max_bars: 持仓 bar 数上限，到期按收盘价出场
+                     以上参数都可以是标量或长度 M 的数组（M 组参数），None / 0 表示不启用；
+                     signal 只有一列时对每组参数复用
+    :return: dict，都是 (N, M)：
+             "signal"      : 叠加出场后的信号（直接替换 df["signal"] 传给引擎）
+             "exit_price"  : 盘中出场的成交价，其余为 NaN（传给 run_batch(exit_price=...)）
+             "exit_reason" : int8 出场原因，见 EXIT_REASONS
+    """
+    sig = np.asarray(signal, dtype=np.float64)
+    if sig.ndim == 1:
+        sig = sig[:, None]
+    if sig.ndim != 2:
+        raise ValueError(f"exit_overlay() signal 需要是 (N,) 或 (N, M)，得到 shape={sig.shape}")
+    n = len(sig)
+
+    params = {"stop_loss": stop_loss, "take_profit": take_profit,
+              "trailing_stop": trailing_stop, "max_bars": max_bars}
+    m = max([sig.shape[1]] + [np.size(v) for v in params.values() if v is not None])
+    if sig.shape[1] not in (1, m):
+        raise ValueError(f"exit_overlay() signal 列数 {sig.shape[1]} 与参数组数 {m} 不一致")
+    # kernel 逐列扫描：用列优先（Fortran）布局，每列在内存里连续
+    sig = np.asfortranarray(np.broadcast_to(sig, (n, m)))
+
+    high = _price(high, n, "high")
+    low = _price(low, n, "low")
+    close = _price(close, n, "close")
+    # 没有开盘价时填 NaN：kernel 里与 NaN 的比较都为 False，成交价就是触发价
+    open_ = np.full(n, np.nan) if open_ is None else _price(open_, n, "open_")
+
+    out_sig = np.zeros((n, m), order="F")
+    out_price = np.full((n, m), np.nan, order="F")
+    out_reason = np.zeros((n, m), dtype=np.int8, order="F")
+
+    _exit_kernel(
+        sig, open_, high, low, close,
+        _param_array(stop_loss, m, "stop_loss"),
+        _param_array(take_profit, m, "take_profit"),
+        _param_array(trailing_stop, m, "trailing_stop"),
+        _param_array(max_bars, m, "max_bars", dtype=np.int64),
+        out_sig, out_price, out_reason,
+    )
+
+    return {"signal": out_sig, "exit_price": out_price, "exit_reason": out_reason}
+
+
+def apply_exits(df: pd.DataFrame, **exit_params) -> pd.DataFrame:
+    """
+    DataFrame 版本：策略输出 df（含 High / Low / Close / signal，可选 Open）上叠加出场规则，
+    替换 signal 并写入 exit_price / exit_reason 两列；BacktestEngine.run 会自动使用 exit_price。
+    exit_params 同 exit_overlay()，这里每个参数只能是标量。
+    """
+    missing = [c for c in ["High", "Low", "Close", "signal"] if c not in df.columns]
+    if missing:
+        raise ValueError(f"apply_exits() Missing: {missing}")
+
+    res = exit_overlay(
+        df["signal"].to_numpy(dtype=float),
+        df["High"].to_numpy(dtype=float),
+        df["Low"].to_numpy(dtype=float),
+        df["Close"].to_numpy(dtype=float),
+        open_=df["Open"].to_numpy(dtype=float) if "Open" in df.columns else None,
+        **exit_params,
+    )
+    if res["signal"].shape[1] != 1:
+        raise ValueError("apply_exits() 每个出场参数只能是标量；多组参数请用 exit_overlay()")
+
+    df["signal"] = res["signal"][:, 0]
+    df["exit_price"] = res["exit_price"][:, 0]
+    df["exit_reason"] = res["exit_reason"][:, 0]
+    return df
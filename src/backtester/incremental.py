@@ -0,0 +1,121 @@
+# src/backtester/incremental.py
+import math
+
+import pandas as pd
+
+from src.strategies import apply_strategy
+from src.strategies.incremental import IncrementalStrategy, make_incremental_strategy
+from .engine import BacktestEngine
+
+
+class IncrementalEngine:
+    """
+    逐 bar 回测引擎：每来一根 bar，O(1) 更新信号 / 仓位 / 净值。
+    每根 bar 的输出与 BacktestEngine.run 对应行一致：
+      position = 上一根 signal
+      price_ret = Close / 上一根 Close - 1
+      trade_flag = |signal - 上一根 signal|
+      cost = trade_flag * (commission + slippage)
+      equity *= 1 + position * price_ret - cost
+    """
+
+    def __init__(
+        self,
+        strategy,
+        initial_capital: float = 10_000.0,
+        commission: float = 0.0005,
+        slippage: float = 0.0002,
+        **strategy_params,
+    ):
+        if isinstance(strategy, IncrementalStrategy):
+            self.strategy = strategy
+        else:
+            self.strategy = make_incremental_strategy(strategy, **strategy_params)
+
+        self.initial_capital = float(initial_capital)
+        self.commission = float(commission)
+        self.slippage = float(slippage)
+
+        self.prev_signal = 0.0
+        self.last_close = None
+        self.equity = self.initial_capital
+        self.n_bars = 0
+
+    def on_bar(self, bar) -> dict:
+        """
+        :param bar: 至少包含 Close（breakout 还需 High / Low）的 dict / Series
+        :return: 当根 bar 的 signal / position / ... / equity
+        """
+        close = float(bar["Close"])
+
+        position = self.prev_signal
+        if self.last_close is None:
+            price_ret = 0.0
+        else:
+            price_ret = close / self.last_close - 1.0 if self.last_close != 0 else math.inf
+            if math.isnan(price_ret):
+                price_ret = 0.0
+        strategy_ret = position * price_ret
+
+        signal = self.strategy.on_bar(bar)
+        trade_flag = abs(signal - self.prev_signal) if self.n_bars else 0.0
+
+        commission_cost = trade_flag * self.commission
+        slippage_cost = trade_flag * self.slippage
+        cost = commission_cost + slippage_cost
+
+        net_ret = strategy_ret - cost
+        self.equity *= 1.0 + net_ret
+
+        self.prev_signal = signal
+        self.last_close = close
+        self.n_bars += 1
+
+        return {
+            "signal": signal,
+            "position": position,
+            "price_ret": price_ret,
+            "strategy_ret": strategy_ret,
+            "trade_flag": trade_flag,
+            "commission_cost": commission_cost,
+            "slippage_cost": slippage_cost,
+            "cost": cost,
+            "net_ret": net_ret,
+            "equity": self.equity,
+        }
+
+    def prime(self, df_hist: pd.DataFrame) -> pd.DataFrame:
+        """
+        用历史数据初始化：滚动状态逐 bar 喂一遍（一次性 O(n)），
+        信号 / 仓位 / 净值直接取 batch 回测最后一行，之后的 on_bar 与
+        对 历史 + 新 bar 整体跑 batch 的结果逐 bar 一致。
+        :return: 历史部分的 batch 回测结果
+        """
+        if self.n_bars:
+            raise RuntimeError("IncrementalEngine.prime() 只能在第一根 bar 之前调用")
+
+        for _, bar in df_hist.iterrows():
+            self.strategy.update(bar)
+
+        df_sig = apply_strategy(df_hist.copy(), self.strategy.name, **self.strategy.params)
+        engine = BacktestEngine(
+            initial_capital=self.initial_capital,
+            commission=self.commission,
+            slippage=self.slippage,
+        )
+        df_bt = engine.run(df_sig)
+
+        if len(df_bt):
+            last = df_bt.iloc[-1]
+            self.strategy.signal = float(last["signal"])
+            self.prev_signal = float(last["signal"])
+            self.last_close = float(last["Close"])
+            self.equity = float(last["equity"])
+            self.n_bars = len(df_bt)
+
+        return df_bt
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        """逐 bar 跑完 df（主要用于和 batch 结果对账）。"""
+        rows = [self.on_bar(bar) for _, bar in df.iterrows()]
+        return pd.DataFrame(rows, index=df.index)
@@ -72,3 +72,329 @@ def volatility(df_or_returns, freq="1d"):
     ann = _annualize_factor(freq)
 
     return returns.std() * np.sqrt(ann)
+
+
+# ============================================================
+# Batch metrics：(N, M) 矩阵，每列一条收益 / 净值曲线，一次返回 M 个值
+# NaN / inf 用 where= 掩码跳过，不做 copy + dropna
+# ============================================================
+def _batch_input(x):
+    if isinstance(x, (pd.DataFrame, pd.Series)):
+        arr = x.to_numpy(dtype=float)
+    else:
+        arr = np.asarray(x, dtype=float)
+    if arr.ndim == 1:
+        arr = arr[:, None]
+    if arr.ndim != 2:
+        raise ValueError(f"batch metrics 需要 (N, M) 矩阵，得到 shape={arr.shape}")
+    return arr, np.isfinite(arr)
+
+
+def _batch_output(values, like):
+    if isinstance(like, pd.DataFrame):
+        return pd.Series(values, index=like.columns)
+    if np.ndim(like) == 1:
+        return float(values[0])
+    return values
+
+
+def _masked_mean(arr, valid):
+    n = valid.sum(axis=0)
+    total = np.sum(arr, axis=0, where=valid)
+    return np.divide(total, n, out=np.full(arr.shape[1], np.nan), where=n > 0), n
+
+
+def _masked_mean_std(arr, valid):
+    """按列的 mean / 样本 std (ddof=1)，只统计 valid 的元素。"""
+    mean, n = _masked_mean(arr, valid)
+    dev = np.subtract(arr, mean, out=np.zeros_like(arr), where=valid)
+    var = np.divide((dev * dev).sum(axis=0), n - 1, out=np.full(arr.shape[1], np.nan), where=n > 1)
+    return mean, np.sqrt(var)
+
+
+# Sharpe Ratio (batch)
+def sharpe_ratio_batch(returns, freq="1d"):
+    """每列的 sharpe_ratio；std 为 0 时为 0，有效值不足 2 个时为 NaN。"""
+    arr, valid = _batch_input(returns)
+    mean, std = _masked_mean_std(arr, valid)
+    out = np.divide(mean, std, out=np.zeros_like(mean), where=std != 0)
+    out[np.isnan(std)] = np.nan
+    return _batch_output(out * np.sqrt(_annualize_factor(freq)), returns)
+
+
+# Volatility (batch)
+def volatility_batch(returns, freq="1d"):
+    arr, valid = _batch_input(returns)
+    _, std = _masked_mean_std(arr, valid)
+    return _batch_output(std * np.sqrt(_annualize_factor(freq)), returns)
+
+
+# Sortino Ratio (batch)
+def sortino_ratio_batch(returns, freq="1d", target: float = 0.0):
+    """
+    mean(r - target) / downside deviation * sqrt(ann)，
+    downside deviation = sqrt(mean(min(r - target, 0)^2))（对全部有效 bar 求均值）。
+    没有下行波动时为 0。
+    """
+    arr, valid = _batch_input(returns)
+    excess = arr - target
+    mean, n = _masked_mean(excess, valid)
+
+    downside = np.minimum(excess, 0.0, out=np.zeros_like(excess), where=valid)
+    dd = np.sqrt(_masked_mean(downside * downside, valid)[0])
+
+    out = np.divide(mean, dd, out=np.zeros_like(mean), where=dd > 0)
+    out[n == 0] = np.nan
+    return _batch_output(out * np.sqrt(_annualize_factor(freq)), returns)
+
+
+# Max Drawdown (batch)
+def max_drawdown_batch(equity):
+    """每列净值曲线的 max_drawdown（负数），NaN 不影响 running max。"""
+    arr, valid = _batch_input(equity)
+    peak = np.fmax.accumulate(arr, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dd = arr / peak - 1.0
+    out = np.min(dd, axis=0, where=valid, initial=0.0)
+    out[~valid.any(axis=0)] = np.nan
+    return _batch_output(out, equity)
+
+
+def _equity_from_returns(arr, valid):
+    """缺失收益按 0 处理，累乘得到起点为 1 的净值。"""
+    growth = np.add(arr, 1.0, out=np.ones_like(arr), where=valid)
+    return np.cumprod(growth, axis=0)
+
+
+# Calmar Ratio (batch)
+def calmar_ratio_batch(returns, freq="1d"):
+    """
+    年化复合收益 / |max drawdown|，returns 为 (N, M) 的 net_ret。
+    没有回撤时为 NaN（比值无定义）。
+    """
+    arr, valid = _batch_input(returns)
+    n = valid.sum(axis=0)
+    equity = _equity_from_returns(arr, valid)
+
+    total = equity[-1] if len(equity) else np.ones(arr.shape[1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cagr = total ** (_annualize_factor(freq) / n) - 1.0
+    mdd = np.asarray(max_drawdown_batch(equity)).reshape(-1)
+
+    out = np.divide(cagr, -mdd, out=np.full_like(cagr, np.nan), where=mdd < 0)
+    out[n == 0] = np.nan
+    return _batch_output(out, returns)
+
+
+# Hit Rate (batch)
+def hit_rate_batch(returns):
+    """收益非零的 bar 里，收益为正的比例（没有非零收益时为 NaN）。"""
+    arr, valid = _batch_input(returns)
+    active = valid & (arr != 0)
+    wins = (valid & (arr > 0)).sum(axis=0)
+    n_active = active.sum(axis=0)
+    out = np.divide(wins, n_active, out=np.full(arr.shape[1], np.nan), where=n_active > 0)
+    return _batch_output(out, returns)
+
+
+# ============================================================
+# Rolling / running risk metrics（1-D 或 (N, M) 多条曲线）
+# ============================================================
+def _as_matrix(x):
+    """返回 (float 数组, 原对象)；inf 视为缺失。"""
+    arr = np.array(x, dtype=float)
+    arr[np.isinf(arr)] = np.nan
+    return arr, x
+
+
+def _like(arr, like):
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(arr, index=like.index, columns=like.columns)
+    if isinstance(like, pd.Series):
+        return pd.Series(arr, index=like.index, name=like.name)
+    return arr
+
+
+# Rolling Volatility
+def rolling_volatility(returns, window: int, freq="1d"):
+    """
+    滚动年化波动率（样本 std, ddof=1），O(n)。
+    returns 可以是 Series / DataFrame / 1-D / (N, M) 数组，返回同类型。
+    """
+    from src.utils.rolling import RollingWindowCache
+
+    arr, like = _as_matrix(returns)
+    std = RollingWindowCache(arr).std(window)
+    return _like(std * np.sqrt(_annualize_factor(freq)), like)
+
+
+# Rolling Sharpe
+def rolling_sharpe(returns, window: int, freq="1d"):
+    """
+    滚动年化 Sharpe：窗口 mean / std * sqrt(ann)，O(n)。
+    与 sharpe_ratio 一致，窗口内 std 为 0 时记 0；前 window-1 个为 NaN。
+    """
+    from src.utils.rolling import RollingWindowCache
+
+    arr, like = _as_matrix(returns)
+    cache = RollingWindowCache(arr)
+    mean = cache.mean(window)
+    std = cache.std(window)
+
+    sharpe = np.divide(mean, std, out=np.zeros_like(mean), where=std > 0)
+    sharpe[np.isnan(mean) | np.isnan(std)] = np.nan
+    return _like(sharpe * np.sqrt(_annualize_factor(freq)), like)
+
+
+# Drawdown Series
+def drawdown_series(equity):
+    """
+    每根 bar 相对历史最高净值的回撤（<= 0），running max 一次扫描。
+    equity 可以是含 equity 列的回测 DataFrame、Series、1-D / (N, M) 数组。
+    """
+    if isinstance(equity, pd.DataFrame) and "equity" in equity.columns:
+        equity = equity["equity"]
+
+    arr, like = _as_matrix(equity)
+    peak = np.fmax.accumulate(arr, axis=0)
+    return _like(arr / peak - 1.0, like)
+
+
+UNDERWATER_COLUMNS = ["start", "trough", "end", "depth", "duration", "recovery_time", "recovered"]
+
+
+def _underwater_1d(dd: np.ndarray, labels) -> pd.DataFrame:
+    under = dd < 0
+    n = len(dd)
+
+    edges = np.diff(np.concatenate([[False], under, [False]]).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1          # 最后一个水下 bar
+
+    if len(starts) == 0:
+        return pd.DataFrame(columns=UNDERWATER_COLUMNS)
+
+    # 每段的最低点：reduceat 求段内最小值，再取段内第一次达到该值的位置
+    depth = np.minimum.reduceat(np.where(under, dd, 0.0), starts)
+    seg = np.cumsum(edges[:-1] == 1) - 1               # 每个 bar 所属的段号
+    seg_min = np.where(under, depth[np.clip(seg, 0, None)], np.nan)
+    hit = np.flatnonzero(under & (dd == seg_min))
+    _, first = np.unique(seg[hit], return_index=True)
+    troughs = hit[first]
+
+    recovered = ends < n - 1
+    recovery = np.where(recovered, ends + 1, -1)    # 回到前高的 bar
+
+    labels = np.asarray(labels)
+    return pd.DataFrame({
+        "start": labels[starts],
+        "trough": labels[troughs],
+        "end": pd.Series(labels[np.maximum(recovery, 0)]).where(recovered).to_numpy(),
+        "depth": depth,
+        "duration": ends - starts + 1,
+        "recovery_time": np.where(recovered, recovery - troughs, -1),
+        "recovered": recovered,
+    }, columns=UNDERWATER_COLUMNS)
+
+
+# Underwater Periods
+def underwater_periods(equity) -> pd.DataFrame:
+    """
+    回撤区间表，每行一段“水下”区间：
+      start / trough / end   : 第一根水下 bar / 最低点 / 回到前高的 bar（未恢复为 NaN）
+      depth                  : 最大回撤（负数）
+      duration               : 水下 bar 数
+      recovery_time          : 最低点到恢复的 bar 数（未恢复为 -1）
+    pandas 输入时位置用索引标签表示；多条曲线时多一列 column。
+    """
+    dd = drawdown_series(equity)
+
+    if isinstance(dd, pd.Series):
+        return _underwater_1d(dd.to_numpy(), dd.index)
+    if isinstance(dd, np.ndarray) and dd.ndim == 1:
+        return _underwater_1d(dd, np.arange(len(dd)))
+
+    if isinstance(dd, pd.DataFrame):
+        cols, labels, values = list(dd.columns), dd.index, dd.to_numpy()
+    else:
+        cols, labels, values = list(range(dd.shape[1])), np.arange(len(dd)), dd
+
+    frames = []
+    for j, col in enumerate(cols):
+        f = _underwater_1d(values[:, j], labels)
+        f.insert(0, "column", col)
+        frames.append(f)
+    return pd.concat(frames, ignore_index=True)
+
+
+class RollingRiskState:
+    """
+    逐 bar 更新的风险状态（实盘 / 增量回测用），可同时跟踪 M 条曲线。
+    update(net_ret) 每次 O(M)：环形缓冲 + running sum 维护滚动 mean / std，
+    running max 维护回撤、最大回撤和当前水下 bar 数。
+    """
+
+    def __init__(self, window: int, n_curves: int = 1, freq="1d", initial_capital: float = 1.0):
+        if window < 2:
+            raise ValueError(f"window 必须 >= 2，得到 {window}")
+        self.window = int(window)
+        self.ann = np.sqrt(_annualize_factor(freq))
+
+        self.buf = np.zeros((self.window, n_curves))
+        self.sum = np.zeros(n_curves)
+        self.sumsq = np.zeros(n_curves)
+        self.n_bars = 0
+
+        self.equity = np.full(n_curves, float(initial_capital))
+        self.peak = self.equity.copy()
+        self.max_drawdown = np.zeros(n_curves)
+        self.underwater_bars = np.zeros(n_curves, dtype=int)
+
+    def update(self, net_ret) -> dict:
+        r = np.nan_to_num(np.asarray(net_ret, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        r = np.broadcast_to(r, self.sum.shape)
+
+        slot = self.n_bars % self.window
+        old = self.buf[slot].copy()
+        self.buf[slot] = r
+        self.n_bars += 1
+
+        if self.n_bars % self.window == 0:
+            # 每满一圈重新求和，抵消长期累加误差（均摊 O(1)）
+            self.sum = self.buf.sum(axis=0)
+            self.sumsq = (self.buf * self.buf).sum(axis=0)
+        else:
+            self.sum += r - old
+            self.sumsq += r * r - old * old
+
+        self.equity = self.equity * (1.0 + r)
+        np.maximum(self.peak, self.equity, out=self.peak)
+        drawdown = self.equity / self.peak - 1.0
+        np.minimum(self.max_drawdown, drawdown, out=self.max_drawdown)
+        self.underwater_bars = np.where(drawdown < 0, self.underwater_bars + 1, 0)
+
+        return {
+            "volatility": self.volatility(),
+            "sharpe": self.sharpe(),
+            "drawdown": drawdown,
+            "max_drawdown": self.max_drawdown.copy(),
+            "underwater_bars": self.underwater_bars.copy(),
+        }
+
+    def _mean_std(self):
+        if self.n_bars < self.window:
+            nan = np.full(self.sum.shape, np.nan)
+            return nan, nan
+        w = self.window
+        mean = self.sum / w
+        var = np.maximum((self.sumsq - self.sum * self.sum / w) / (w - 1), 0.0)
+        return mean, np.sqrt(var)
+
+    def volatility(self) -> np.ndarray:
+        return self._mean_std()[1] * self.ann
+
+    def sharpe(self) -> np.ndarray:
+        mean, std = self._mean_std()
+        out = np.divide(mean, std, out=np.zeros_like(mean), where=std > 0)
+        out[np.isnan(std)] = np.nan
+        return out * self.ann
@@ -0,0 +1,185 @@
+# src/backtester/sizing.py
+"""
+Volatility-targeting position sizing.
+
+Scales a signal matrix (N, M) so that each column's position targets an
+annualised volatility:
+
+    position = signal * target_vol / (bar_vol * sqrt(ann))
+
+bar_vol is the rolling std of bar returns (the vol20 factor from
+add_vol_factors, reused when the DataFrame already has it) or an EWMA std. It
+only uses returns up to the current bar, and the engine shifts the sized signal
+by one bar, so there is no look-ahead. A leverage cap clips |position|, and a
+turnover limit caps |Δposition| per bar, except on exit bars (exit_price set by
+the exit overlay), which always go flat because the engine books the whole
+position at the fill. The turnover limit is path-dependent
+and runs in a small compiled loop; everything else is whole-matrix numpy.
+
+BacktestEngine(sizer=VolTargetSizer(...)) applies the stage inside run() /
+run_batch(), so costs are charged on the sized turnover.
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.jit import njit
+from .metrics import _annualize_factor
+
+
+# ============================================================
+# Volatility estimates
+# ============================================================
+def bar_volatility(close, method: str = "rolling", window: int = 20, halflife: float | None = None) -> np.ndarray:
+    """
+    每根 bar 的（未年化）收益波动率。
+
+    :param close: (N,) 或 (N, M) 价格
+    :param method: "rolling" — 过去 window 根收益的样本 std（与 vol20 因子相同）；
+                   "ewma" — 指数加权 std，halflife 默认 window / 2，前 window 根为 NaN
+    :return: (N, M) float 数组，warm-up 期为 NaN
+    """
+    close = np.asarray(close, dtype=float)
+    if close.ndim == 1:
+        close = close[:, None]
+    ret = pd.DataFrame(close).pct_change()
+
+    if method == "rolling":
+        vol = ret.rolling(window).std()
+    elif method == "ewma":
+        halflife = window / 2 if halflife is None else halflife
+        vol = ret.ewm(halflife=halflife, min_periods=window).std()
+    else:
+        raise ValueError(f"未知波动率方法 '{method}', 可选: rolling, ewma")
+
+    return vol.to_numpy()
+
+
+# ============================================================
+# Sizing
+# ============================================================
+@njit(cache=True, nogil=True)
+def _turnover_kernel(target, max_turnover, flat, out):
+    """
+    out[t] = out[t-1] + clip(target[t] - out[t-1], ±max_turnover)，起始仓位为 0。
+    flat[t] 为 True 的 bar（盘中止损 / 止盈已出场）直接归零，不受换手限制。
+    """
+    n, m = target.shape
+    prev = np.zeros(m)
+    # 按行扫描（所有列一起前进），C 布局下内存连续
+    for t in range(n):
+        for j in range(m):
+            if flat[t, j]:
+                prev[j] = 0.0
+            else:
+                step = target[t, j] - prev[j]
+                if step > max_turnover:
+                    step = max_turnover
+                elif step < -max_turnover:
+                    step = -max_turnover
+                prev[j] += step
+            out[t, j] = prev[j]
+
+
+def vol_target_positions(
+    signals,
+    vol,
+    target_vol: float = 0.15,
+    freq: str = "1d",
+    max_leverage: float | None = None,
+    max_turnover: float | None = None,
+    flat=None,
+) -> np.ndarray:
+    """
+    :param signals: (N,) 或 (N, M) 信号（-1/0/1 或连续权重），NaN 视为 0
+    :param vol: (N,) / (N, 1) / (N, M) 每根 bar 的收益波动率（未年化，如 vol20）；
+                NaN 或 <= 0（warm-up、停牌）时仓位为 0
+    :param target_vol: 年化目标波动率
+    :param max_leverage: |仓位| 上限，None 表示不限制
+    :param max_turnover: 每根 bar 的 |仓位变化| 上限，None 表示不限制
+    :param flat: (N,) / (N, 1) / (N, M) bool，True 的 bar 仓位目标强制为 0 且不受换手限制
+                 （exit_price 非 NaN 的出场 bar：引擎把整根 bar 的持仓按成交价平掉）
+    :return: (N, M) float64 仓位目标（作为 signal 交给引擎）
+    """
+    sig = np.asarray(signals, dtype=float)
+    if sig.ndim == 1:
+        sig = sig[:, None]
+    vol = np.asarray(vol, dtype=float)
+    if vol.ndim == 1:
+        vol = vol[:, None]
+    if sig.ndim != 2 or vol.ndim != 2 or len(vol) != len(sig) or vol.shape[1] not in (1, sig.shape[1]):
+        raise ValueError(f"vol_target_positions() signals / vol 形状不匹配: {sig.shape} vs {vol.shape}")
+
+    ann_vol = vol * np.sqrt(_annualize_factor(freq))
+    scale = np.divide(target_vol, ann_vol, out=np.zeros(ann_vol.shape), where=ann_vol > 0)
+
+    pos = sig * scale
+    pos[np.isnan(pos)] = 0.0
+
+    if flat is not None:
+        flat = np.asarray(flat, dtype=bool)
+        if flat.ndim == 1:
+            flat = flat[:, None]
+        if flat.ndim != 2 or len(flat) != len(pos) or flat.shape[1] not in (1, pos.shape[1]):
+            raise ValueError(f"vol_target_positions() flat 形状不匹配: {flat.shape} vs {pos.shape}")
+        flat = np.ascontiguousarray(np.broadcast_to(flat, pos.shape))
+        pos[flat] = 0.0
+
+    if max_leverage is not None:
+        np.clip(pos, -max_leverage, max_leverage, out=pos)
+
+    if max_turnover is not None:
+        if flat is None:
+            flat = np.zeros(pos.shape, dtype=bool)
+        _turnover_kernel(pos, float(max_turnover), flat, pos)   # 逐行原地更新
+
+    return pos
+
+
+class VolTargetSizer:
+    """
+    BacktestEngine 的 sizer：sizer(signals, close, vol=None, flat=None) -> (N, M) 仓位目标。
+    flat 是出场 bar 的 bool 掩码（回测带 exit_price 时引擎才会传），这些 bar 的目标必须为 0。
+
+    :param method / window / halflife: 见 bar_volatility
+    :param vol_column: 回测 df 里已有该列时直接用它作为波动率（默认 rolling 20 时复用 vol20 因子）
+    其余参数见 vol_target_positions。
+    """
+
+    def __init__(
+        self,
+        target_vol: float = 0.15,
+        method: str = "rolling",
+        window: int = 20,
+        halflife: float | None = None,
+        freq: str = "1d",
+        max_leverage: float | None = 2.0,
+        max_turnover: float | None = None,
+        vol_column: str | None = None,
+    ):
+        if target_vol <= 0:
+            raise ValueError(f"target_vol 必须 > 0，得到 {target_vol}")
+        _annualize_factor(freq)   # 提前校验 freq
+
+        self.target_vol = float(target_vol)
+        self.method = method
+        self.window = int(window)
+        self.halflife = halflife
+        self.freq = freq
+        self.max_leverage = max_leverage
+        self.max_turnover = max_turnover
+        if vol_column is None and method == "rolling" and self.window == 20:
+            vol_column = "vol20"
+        self.vol_column = vol_column
+
+    def __call__(self, signals, close, vol=None, flat=None) -> np.ndarray:
+        if vol is None:
+            vol = bar_volatility(close, self.method, self.window, self.halflife)
+        return vol_target_positions(
+            signals,
+            vol,
+            target_vol=self.target_vol,
+            freq=self.freq,
+            max_leverage=self.max_leverage,
+            max_turnover=self.max_turnover,
+            flat=flat,
+        )
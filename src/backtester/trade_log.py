@@ -1,36 +1,48 @@
+import numpy as np
 import pandas as pd
 
-def generate_trade_log(df_bt: pd.DataFrame):
+TRADE_COLUMNS = ["timestamp", "action", "price", "prev_pos", "new_pos", "pnl"]
 
-    trades = []
 
-    df = df_bt.copy()
-    df = df.reset_index()       
-    df.rename(columns={"index": "timestamp"}, inplace=True)
+def generate_trade_log(df_bt: pd.DataFrame, as_frame: bool = False, pos_step: float | None = None):
+    """
+    从回测结果中提取换仓记录（position 发生变化的 bar）。
 
-    prev_pos = 0
+    :param as_frame: True 返回 DataFrame，False 返回 list[dict]（与以前一致）
+    :param pos_step: 连续仓位（如 meta_transformer 的加权信号）先按该步长取整，
+                     只有取整后的仓位变化才记为一笔交易，避免每根 bar 都成交
+    """
+    pos = df_bt["position"].to_numpy(dtype=float)
 
-    for i in range(len(df)):
-        row = df.iloc[i]
-        pos = row["position"]
+    if pos_step:
+        pos = np.round(pos / pos_step) * pos_step
 
-        if pos != prev_pos:
-            if pos > prev_pos:
-                action = "BUY"
-            elif pos < prev_pos:
-                action = "SELL"
-            else:
-                action = "HOLD"
+    prev = np.empty_like(pos)
+    prev[:1] = 0.0
+    prev[1:] = pos[:-1]
 
-            trades.append({
-                "timestamp": row["timestamp"],
-                "action": action,
-                "price": row["Close"],
-                "prev_pos": prev_pos,
-                "new_pos": pos,
-                "pnl": row.get("strategy_ret", 0),
-            })
+    # pos != prev 对 NaN 也成立，与逐行比较的语义相同
+    idx = np.flatnonzero(pos != prev)
 
-        prev_pos = pos
+    new_pos = pos[idx]
+    prev_pos = prev[idx]
+    action = np.where(new_pos > prev_pos, "BUY", np.where(new_pos < prev_pos, "SELL", "HOLD"))
 
-    return trades
+    if "strategy_ret" in df_bt.columns:
+        pnl = df_bt["strategy_ret"].to_numpy()[idx]
+    else:
+        pnl = np.zeros(len(idx))
+
+    trades = pd.DataFrame({
+        "timestamp": df_bt.index[idx],
+        "action": action,
+        "price": df_bt["Close"].to_numpy()[idx],
+        "prev_pos": prev_pos,
+        "new_pos": new_pos,
+        "pnl": pnl,
+    }, columns=TRADE_COLUMNS)
+
+    if as_frame:
+        return trades
+
+    return trades.to_dict("records")
@@ -1,6 +1,8 @@
 
 
 DATA_PATH = "data/raw/data.csv"
+# 多标的 panel：目录下每个标的一个 CSV（文件名 = symbol）
+PANEL_DIR = "data/panel"
 
 RESULT_DIR = "results"
 CHART_DIR = f"{RESULT_DIR}/charts"
@@ -24,3 +26,10 @@ STRATEGY_PARAMS = {
 
 MA_SHORT_RANGE = [5, 10, 20, 30]
 MA_LONG_RANGE  = [50, 100, 150]
+
+# Grid Search 进程数：1 = 串行，None = 全部 CPU
+GRID_N_JOBS = 1
+
+# Profiling：记录各阶段 wall / CPU / 峰值内存，导出 JSON + Chrome trace
+PROFILE = False
+PROFILE_DIR = f"{RESULT_DIR}/profile"
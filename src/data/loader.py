@@ -1,13 +1,27 @@
+import hashlib
+import os
+import shutil
+import time
+import tracemalloc
+import warnings
+
 import pandas as pd
 
-def load_data(path: str):
-    df = pd.read_csv(path)
+from .store import StoreWriter, is_store, load_frame, non_numeric_columns, read_meta, save_frame
 
-    try:
-        pd.to_datetime(df.iloc[0, 0])
-    except:
-        df = df[1:].reset_index(drop=True)
+DEFAULT_CACHE_DIR = "data/cache"
+
+_HASH_BLOCK = 8 * 1024 * 1024
 
+# 已经提示过“含非数值列、无法缓存”的源文件，每个文件只警告一次
+_UNCACHEABLE_WARNED = set()
+
+
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    统一列名 / 类型：时间列 → timestamp，OHLCV 转数值，Volume 缺失补 0。
+    不排序、不设索引（分块读取时每块都会调用）。
+    """
     for time_col in ["Datetime", "datetime", "Timestamp", "timestamp", "Date"]:
         if time_col in df.columns:
             df.rename(columns={time_col: "timestamp"}, inplace=True)
@@ -27,7 +41,171 @@ def load_data(path: str):
 
     df["Volume"] = df["Volume"].fillna(0.0)
     df = df.dropna(subset=["Close"])
+
+    return df
+
+
+def _parse_csv(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+
+    try:
+        pd.to_datetime(df.iloc[0, 0])
+    except:
+        df = df[1:].reset_index(drop=True)
+
+    df = _normalize_frame(df)
     df = df.sort_values("timestamp")
     df = df.set_index("timestamp")
 
     return df
+
+
+# ============================================================
+# 二进制缓存：key = 路径 + 大小 + mtime + 内容哈希
+# ============================================================
+def _file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _cache_key(path: str) -> dict:
+    st = os.stat(path)
+    return {
+        "path": os.path.abspath(path),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "content_hash": _file_digest(path),
+    }
+
+
+def _cache_path(key: dict, cache_dir: str) -> str:
+    name = hashlib.sha1(repr(sorted(key.items())).encode("utf-8")).hexdigest()
+    stem = os.path.splitext(os.path.basename(key["path"]))[0]
+    return os.path.join(cache_dir, f"{stem}-{name[:16]}")
+
+
+def _evict_stale(cache_dir: str, key: dict, keep: str) -> None:
+    """删掉同一源文件的旧版本缓存。"""
+    stem = os.path.splitext(os.path.basename(key["path"]))[0]
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if entry == keep or not name.startswith(f"{stem}-") or not is_store(entry):
+            continue
+        if read_meta(entry).get("source", {}).get("path") == key["path"]:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def load_data(path: str, use_cache: bool = True, cache_dir: str = DEFAULT_CACHE_DIR):
+    """
+    读取 OHLCV CSV，返回按 timestamp 排序、以 timestamp 为索引的 DataFrame。
+
+    path 也可以是 ingest_csv 生成的 store 目录，此时各列以只读 memmap 返回。
+    use_cache=True 时，清洗后的结果以列式二进制格式缓存在 cache_dir 下；
+    源文件路径 / 大小 / mtime / 内容任一变化都会重新解析。
+    """
+    if os.path.isdir(path) and is_store(path):
+        # ingest_csv 写出的 store：直接 memory-map
+        return load_frame(path, mmap=True)
+
+    if not use_cache:
+        return _parse_csv(path)
+
+    key = _cache_key(path)
+    cached = _cache_path(key, cache_dir)
+
+    if is_store(cached) and read_meta(cached).get("source") == key:
+        return load_frame(cached)
+
+    df = _parse_csv(path)
+
+    bad = non_numeric_columns(df)
+    if bad:
+        if key["path"] not in _UNCACHEABLE_WARNED:
+            _UNCACHEABLE_WARNED.add(key["path"])
+            warnings.warn(
+                f"load_data(): {path} 含非数值列 {bad}，无法写入缓存，每次都会重新解析 CSV；"
+                f"去掉这些列或转成数值后即可缓存",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        return df
+
+    try:
+        save_frame(df, cached, extra_meta={"source": key})
+        _evict_stale(cache_dir, key, keep=cached)
+    except OSError:
+        # 只读目录：缓存失败不影响正常返回
+        pass
+
+    return df
+
+
+# ============================================================
+# 大文件：分块流式读取 → 列式 store
+# ============================================================
+def ingest_csv(path: str, out_dir: str, chunksize: int = 500_000) -> dict:
+    """
+    按 chunksize 行分块读取 CSV，每块做与 load_data 相同的清洗，
+    增量写入列式 store（out_dir），内存占用与文件大小无关。
+    之后用 load_data(out_dir) / load_frame(out_dir, mmap=True) 读取。
+
+    写入 OHLCV 及首块中其余数值列（统一 float64）；数据乱序时每块写入前先排序，
+    close 阶段在磁盘上 k 路归并各有序段，重排同样只占用约一块的内存。
+    返回统计信息：rows / chunks / seconds / peak_mem_bytes（tracemalloc 峰值）。
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+
+    writer = StoreWriter(out_dir, block_rows=chunksize)
+    keep_cols = None
+    n_chunks = 0
+
+    try:
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            if n_chunks == 0:
+                try:
+                    pd.to_datetime(chunk.iloc[0, 0])
+                except:
+                    chunk = chunk[1:]
+            n_chunks += 1
+
+            chunk = _normalize_frame(chunk)
+
+            if keep_cols is None:
+                ohlcv = ["Open", "High", "Low", "Close", "Volume"]
+                extra = [
+                    c for c in chunk.columns
+                    if c not in ohlcv and c != "timestamp"
+                    and pd.api.types.is_numeric_dtype(chunk[c])
+                ]
+                keep_cols = ohlcv + extra
+            for col in keep_cols:
+                if col not in chunk.columns:
+                    chunk[col] = float("nan")
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+
+            writer.append(chunk.set_index("timestamp")[keep_cols])
+            del chunk
+
+        meta = writer.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    return {
+        "path": out_dir,
+        "rows": meta["rows"],
+        "chunks": n_chunks,
+        "resorted": not writer.is_sorted,
+        "seconds": time.perf_counter() - t0,
+        "peak_mem_bytes": int(peak),
+    }
@@ -0,0 +1,66 @@
+# src/data/panel.py
+import glob
+import os
+
+import pandas as pd
+
+from .loader import load_data
+from .store import is_store
+
+PANEL_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _symbol_sources(directory: str, pattern: str) -> dict:
+    sources = {}
+    for path in sorted(glob.glob(os.path.join(directory, pattern))):
+        if os.path.isfile(path):
+            sources[os.path.splitext(os.path.basename(path))[0]] = path
+
+    # ingest_csv 生成的 store 目录也算一个标的
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path) and is_store(path):
+            sources.setdefault(name, path)
+
+    return sources
+
+
+def load_panel(
+    directory: str,
+    pattern: str = "*.csv",
+    fields=PANEL_FIELDS,
+    symbols: list[str] | None = None,
+    use_cache: bool = True,
+) -> dict:
+    """
+    读取目录下每个标的一个文件（文件名即 symbol），按时间对齐成 panel。
+
+    :return: {field: DataFrame}，每个 DataFrame 为 (time × symbol)，
+             索引是所有标的时间戳的并集，某标的缺失的 bar 为 NaN
+    """
+    sources = _symbol_sources(directory, pattern)
+    if symbols is not None:
+        missing = [s for s in symbols if s not in sources]
+        if missing:
+            raise ValueError(f"load_panel() 找不到标的文件: {missing}")
+        sources = {s: sources[s] for s in symbols}
+    if not sources:
+        raise ValueError(f"load_panel() 目录下没有数据文件: {directory}")
+
+    frames = {}
+    for sym, path in sources.items():
+        df = load_data(path, use_cache=use_cache)
+        # 对齐要求每个标的时间戳唯一
+        frames[sym] = df[~df.index.duplicated(keep="last")]
+
+    panel = {}
+    for field in fields:
+        wide = pd.concat(
+            {sym: df[field] for sym, df in frames.items()},
+            axis=1,
+            sort=True,
+        )
+        wide.columns.name = "symbol"
+        panel[field] = wide.astype(float)
+
+    return panel
@@ -0,0 +1,275 @@
+# src/data/store.py
+"""
+Columnar on-disk store for cleaned bar frames.
+
+A store is a directory holding one ``.npy`` file per column, the timestamp
+index as ``index.npy`` and a ``meta.json`` describing column names, the index
+timezone and the row count. Columns can be opened as read-only memory maps,
+so loading a cached frame costs little more than the ``open()`` calls.
+"""
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+META_FILE = "meta.json"
+INDEX_FILE = "index.npy"
+
+
+def _column_file(i: int) -> str:
+    return f"col_{i}.npy"
+
+
+def is_store(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def read_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def non_numeric_columns(df: pd.DataFrame) -> list:
+    """store 存不下的列（非数值 / 非 bool）。"""
+    return [c for c in df.columns if not (
+        pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c])
+    )]
+
+
+def save_frame(df: pd.DataFrame, path: str, extra_meta: dict | None = None) -> None:
+    """
+    把 DatetimeIndex 的数值型 DataFrame 写成列式 store。
+    先写到临时目录再 rename，读者不会看到写了一半的 store。
+    """
+    if not isinstance(df.index, pd.DatetimeIndex):
+        raise ValueError("save_frame() 需要 DatetimeIndex")
+
+    bad = non_numeric_columns(df)
+    if bad:
+        raise ValueError(f"save_frame() 只支持数值列，非数值列: {bad}")
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp)
+
+    try:
+        # tz-aware index 的 .values 是 UTC 下的 naive datetime64
+        np.save(os.path.join(tmp, INDEX_FILE), df.index.values)
+        for i, col in enumerate(df.columns):
+            np.save(os.path.join(tmp, _column_file(i)), df[col].to_numpy())
+
+        meta = {
+            "columns": [str(c) for c in df.columns],
+            "index_name": df.index.name,
+            "tz": str(df.index.tz) if df.index.tz is not None else None,
+            "rows": int(len(df)),
+        }
+        if extra_meta:
+            meta.update(extra_meta)
+        with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def load_frame(path: str, mmap: bool = False) -> pd.DataFrame:
+    """
+    读取 save_frame 写出的 store。
+    mmap=True 时各列是只读 memory map，不把整列读进内存。
+    """
+    meta = read_meta(path)
+    mode = "r" if mmap else None
+
+    index = pd.DatetimeIndex(np.load(os.path.join(path, INDEX_FILE), mmap_mode=mode))
+    if meta.get("tz"):
+        index = index.tz_localize("UTC").tz_convert(meta["tz"])
+    index.name = meta.get("index_name")
+
+    data = {
+        col: np.load(os.path.join(path, _column_file(i)), mmap_mode=mode)
+        for i, col in enumerate(meta["columns"])
+    }
+
+    return pd.DataFrame(data, index=index, columns=meta["columns"], copy=False)
+
+
+# ============================================================
+# 增量写入：分块 append，close() 时落成与 save_frame 相同的 store
+# ============================================================
+class StoreWriter:
+    """
+    逐块写 store，内存占用只与单块大小有关。
+
+    每块的数据列按 float64、索引按 UTC datetime64[ns] 追加到临时 .bin 文件；
+    乱序的块先在内存里按时间排好再写，连续有序的块组成一个 run。
+    close() 时转成 .npy；有多个 run 时在磁盘上做一次 k 路归并，
+    每轮只读入约 block_rows 行，结果与整体稳定排序相同。
+    """
+
+    def __init__(self, path: str, block_rows: int = 1_000_000):
+        self.path = path
+        self.block_rows = int(block_rows)
+        self.rows = 0
+        self.columns = None
+        self.tz = None
+        self.index_name = None
+        self.is_sorted = True
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self._tmp = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(self._tmp)
+        self._files = {}
+        self._last_ts = None
+        self._run_starts = [0]
+
+    def _bin(self, name: str) -> str:
+        return os.path.join(self._tmp, f"{name}.bin")
+
+    def append(self, df: pd.DataFrame) -> None:
+        if not isinstance(df.index, pd.DatetimeIndex):
+            raise ValueError("StoreWriter.append() 需要 DatetimeIndex")
+
+        if self.columns is None:
+            self.columns = [str(c) for c in df.columns]
+            self.tz = str(df.index.tz) if df.index.tz is not None else None
+            self.index_name = df.index.name
+            self._files[INDEX_FILE] = open(self._bin("index"), "wb")
+            for i in range(len(self.columns)):
+                self._files[i] = open(self._bin(f"col_{i}"), "wb")
+        elif [str(c) for c in df.columns] != self.columns:
+            raise ValueError(
+                f"StoreWriter.append() 列不一致: {list(df.columns)} vs {self.columns}"
+            )
+
+        if len(df) == 0:
+            return
+
+        ts = df.index.values.astype("datetime64[ns]")
+        order = None
+        if not df.index.is_monotonic_increasing:
+            self.is_sorted = False
+            order = np.argsort(ts, kind="stable")
+            ts = ts[order]
+
+        if self._last_ts is not None and ts[0] < self._last_ts:
+            # 与前面的数据重叠：开始一个新的有序 run，close() 时归并
+            self.is_sorted = False
+            self._run_starts.append(self.rows)
+        self._last_ts = ts[-1]
+
+        ts.tofile(self._files[INDEX_FILE])
+        for i, col in enumerate(df.columns):
+            values = df[col].to_numpy(dtype=np.float64)
+            (values if order is None else values[order]).tofile(self._files[i])
+
+        self.rows += len(df)
+
+    def _open_bins(self) -> list:
+        """[(name, dtype, 源 memmap, 目标 .npy memmap)]，index 在第一个。"""
+        specs = [("index", "datetime64[ns]", INDEX_FILE)]
+        specs += [(f"col_{i}", np.float64, _column_file(i)) for i in range(len(self.columns))]
+        return [
+            (
+                name,
+                dtype,
+                np.memmap(self._bin(name), dtype=dtype, mode="r", shape=(self.rows,)),
+                np.lib.format.open_memmap(
+                    os.path.join(self._tmp, dst), mode="w+", dtype=dtype, shape=(self.rows,)
+                ),
+            )
+            for name, dtype, dst in specs
+        ]
+
+    def _copy_runs(self, files) -> None:
+        """只有一个 run：按块原样拷贝。"""
+        for _, _, src, out in files:
+            for start in range(0, self.rows, self.block_rows):
+                stop = min(start + self.block_rows, self.rows)
+                out[start:stop] = src[start:stop]
+
+    def _merge_runs(self, files) -> None:
+        """
+        k 路归并有序 run。每轮从每个 run 读一段（合计约 block_rows 行），
+        以各段末尾 (时间戳, run 序号) 的最小值为界，把所有不超过界的行稳定排序后写出。
+        run 按写入顺序拼接、相同时间戳先取序号小的 run，所以结果与整体稳定排序一致。
+        """
+        starts = self._run_starts
+        pos = np.array(starts, dtype=np.int64)
+        ends = np.array(starts[1:] + [self.rows], dtype=np.int64)
+        step = max(1, self.block_rows // len(starts))
+        ts_src = files[0][2]
+        written = 0
+
+        while written < self.rows:
+            live = np.flatnonzero(pos < ends)
+            stops = np.minimum(pos[live] + step, ends[live])
+            bound_ts, bound_run = min((ts_src[stop - 1], r) for r, stop in zip(live, stops))
+
+            takes = []
+            for r, stop in zip(live, stops):
+                side = "right" if r <= bound_run else "left"
+                k = int(np.searchsorted(ts_src[pos[r]:stop], bound_ts, side=side))
+                if k:
+                    takes.append((int(pos[r]), int(pos[r]) + k))
+                    pos[r] += k
+
+            ts = np.concatenate([ts_src[a:b] for a, b in takes])
+            order = np.argsort(ts, kind="stable")
+            n = len(order)
+            for _, _, src, out in files:
+                chunk = np.concatenate([src[a:b] for a, b in takes])
+                out[written:written + n] = chunk[order]
+            written += n
+
+    def close(self) -> dict:
+        for f in self._files.values():
+            f.close()
+
+        try:
+            if self.columns is None:
+                raise ValueError("StoreWriter.close(): 没有写入任何数据")
+
+            if self.rows == 0:
+                np.save(os.path.join(self._tmp, INDEX_FILE), np.empty(0, dtype="datetime64[ns]"))
+                for i in range(len(self.columns)):
+                    np.save(os.path.join(self._tmp, _column_file(i)), np.empty(0))
+            else:
+                files = self._open_bins()
+                if len(self._run_starts) == 1:
+                    self._copy_runs(files)
+                else:
+                    self._merge_runs(files)
+                for _, _, _, out in files:
+                    out.flush()
+                names = [name for name, _, _, _ in files]
+                del files
+                for name in names:
+                    os.remove(self._bin(name))
+
+            meta = {
+                "columns": self.columns,
+                "index_name": self.index_name,
+                "tz": self.tz,
+                "rows": int(self.rows),
+            }
+            with open(os.path.join(self._tmp, META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+
+            if os.path.exists(self.path):
+                shutil.rmtree(self.path)
+            os.replace(self._tmp, self.path)
+        except BaseException:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            raise
+
+        return meta
@@ -1,17 +1,107 @@
+import numpy as np
 import pandas as pd
-from .technical import add_technical_factors
-from .volatility import add_vol_factors
-from .volume import add_volume_factors
-from .stats import add_stat_factors
+from .technical import add_technical_factors, TECHNICAL_FACTORS
+from .volatility import add_vol_factors, VOL_FACTORS
+from .volume import add_volume_factors, VOLUME_FACTORS
+from .stats import add_stat_factors, STAT_FACTORS
+from src.utils.profiler import span
 
-def generate_factors(df: pd.DataFrame) -> pd.DataFrame:
+# 所有因子：名字 → Factor(func, inputs, lookback)，顺序即全量输出的列顺序
+FACTOR_REGISTRY = {
+    **TECHNICAL_FACTORS,
+    **VOL_FACTORS,
+    **VOLUME_FACTORS,
+    **STAT_FACTORS,
+}
 
-    df = df.copy()
 
-    df = add_technical_factors(df)
-    df = add_vol_factors(df)
-    df = add_volume_factors(df)
-    df = add_stat_factors(df)
+def resolve_factors(columns) -> list:
+    """
+    返回计算 columns 所需的全部因子（含依赖），按拓扑顺序排列。
+    """
+    order = []
+    state = {}   # name -> "visiting" / "done"
 
-    df = df.dropna()
-    return df
+    def visit(name):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"因子依赖有环: {name}")
+        if name not in FACTOR_REGISTRY:
+            raise ValueError(f"未知因子 '{name}', 可选: {list(FACTOR_REGISTRY.keys())}")
+
+        state[name] = "visiting"
+        for dep in FACTOR_REGISTRY[name].inputs:
+            if dep in FACTOR_REGISTRY:
+                visit(dep)
+        state[name] = "done"
+        order.append(name)
+
+    for name in columns:
+        visit(name)
+
+    return order
+
+
+def factor_lookback(columns=None) -> int:
+    """columns 中各因子（含依赖链）需要的最长历史 bar 数。"""
+    columns = list(FACTOR_REGISTRY) if columns is None else columns
+
+    total = {}
+    for name in resolve_factors(columns):
+        f = FACTOR_REGISTRY[name]
+        deps = [total[d] for d in f.inputs if d in FACTOR_REGISTRY]
+        total[name] = f.lookback + max(deps, default=0)
+
+    return max((total[c] for c in columns), default=0)
+
+
+def _compute_selected(df: pd.DataFrame, columns) -> pd.DataFrame:
+    order = resolve_factors(columns)
+
+    base = [c for name in order for c in FACTOR_REGISTRY[name].inputs if c not in FACTOR_REGISTRY]
+    missing = sorted(set(c for c in base if c not in df.columns))
+    if missing:
+        raise ValueError(f"generate_factors() 缺少行情列: {missing}")
+
+    cols = {c: df[c] for c in set(base)}
+    if "Volume" in cols:
+        cols["Volume"] = pd.to_numeric(cols["Volume"], errors="coerce").fillna(0)
+
+    # 按列连续存放，每个因子写进自己那一列
+    values = np.empty((len(df), len(order)), order="F")
+    for j, name in enumerate(order):
+        values[:, j] = FACTOR_REGISTRY[name](cols).to_numpy(dtype=float)
+        cols[name] = pd.Series(values[:, j], index=df.index, copy=False)
+
+    # 与全量版本一致：NaN（warm-up）记为 0
+    values[np.isnan(values)] = 0.0
+
+    keep = [order.index(c) for c in columns]
+    fac = pd.DataFrame(values[:, keep], index=df.index, columns=list(columns))
+
+    out = df.drop(columns=[c for c in columns if c in df.columns]).fillna(0)
+    if "Volume" in out.columns:
+        out["Volume"] = pd.to_numeric(out["Volume"], errors="coerce").fillna(0)
+
+    return pd.concat([out, fac], axis=1)
+
+
+def generate_factors(df: pd.DataFrame, columns=None) -> pd.DataFrame:
+    """
+    :param columns: None → 计算全部因子（原行为）；
+                    因子名列表 → 只算这些因子及其依赖，结果列顺序与 columns 一致
+    """
+    with span("factors", rows=len(df)):
+        if columns is not None:
+            return _compute_selected(df, list(columns))
+
+        df = df.copy()
+
+        df = add_technical_factors(df)
+        df = add_vol_factors(df)
+        df = add_volume_factors(df)
+        df = add_stat_factors(df)
+
+        df = df.dropna()
+        return df
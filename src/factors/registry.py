@@ -0,0 +1,18 @@
+# src/factors/registry.py
+
+
+class Factor:
+    """
+    因子定义：
+      func     : func(cols) -> Series，cols 可按名字取行情列和已算好的因子
+      inputs   : 依赖的行情列 / 其他因子名
+      lookback : 自身需要的历史 bar 数（不含依赖的 lookback）
+    """
+
+    def __init__(self, func, inputs, lookback: int = 0):
+        self.func = func
+        self.inputs = list(inputs)
+        self.lookback = int(lookback)
+
+    def __call__(self, cols):
+        return self.func(cols)
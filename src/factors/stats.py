@@ -1,23 +1,43 @@
 import pandas as pd
 import numpy as np
 
+from .registry import Factor
+
+
+def _roll_corr(c, rolling: int = 20):
+    if c["Volume"].nunique() <= 1:
+        return pd.Series(0.0, index=c["Close"].index)
+    try:
+        return (
+            c["Close"]
+            .rolling(rolling)
+            .corr(c["Volume"].rolling(rolling).mean())
+        )
+    except Exception:
+        return pd.Series(0.0, index=c["Close"].index)
+
+
+def stat_factors(rolling: int = 20) -> dict:
+    return {
+        "roll_corr": Factor(
+            lambda c: _roll_corr(c, rolling), ["Close", "Volume"], lookback=2 * (rolling - 1)
+        ),
+        "vol_mean": Factor(lambda c: c["Close"].rolling(rolling).std(), ["Close"], lookback=rolling - 1),
+        "vol_ratio": Factor(
+            lambda c: c["Close"] / c["Close"].rolling(rolling).mean(), ["Close"], lookback=rolling - 1
+        ),
+    }
+
+
+STAT_FACTORS = stat_factors()
+
+
 def add_stat_factors(df, rolling: int = 20):
     df["Volume"] = pd.to_numeric(df["Volume"], errors="coerce").fillna(0)
 
-    if df["Volume"].nunique() <= 1:
-        df["roll_corr"] = 0.0
-    else:
-        try:
-            df["roll_corr"] = (
-                df["Close"]
-                .rolling(rolling)
-                .corr(df["Volume"].rolling(rolling).mean())
-            )
-        except Exception:
-            df["roll_corr"] = 0.0
-
-    df["vol_mean"] = df["Close"].rolling(rolling).std()
-    df["vol_ratio"] = df["Close"] / df["Close"].rolling(rolling).mean()
+    for name, factor in stat_factors(rolling).items():
+        df[name] = factor(df)
+
     df = df.fillna(0)
 
     return df
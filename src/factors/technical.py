@@ -1,10 +1,18 @@
 import pandas as pd
 import numpy as np
 
+from .registry import Factor
+
+TECHNICAL_FACTORS = {
+    "ret1": Factor(lambda c: c["Close"].pct_change(), ["Close"], lookback=1),
+    "ma5": Factor(lambda c: c["Close"].rolling(5).mean(), ["Close"], lookback=4),
+    "ma10": Factor(lambda c: c["Close"].rolling(10).mean(), ["Close"], lookback=9),
+    "ma20": Factor(lambda c: c["Close"].rolling(20).mean(), ["Close"], lookback=19),
+    "momentum10": Factor(lambda c: c["Close"].pct_change(10), ["Close"], lookback=10),
+}
+
+
 def add_technical_factors(df: pd.DataFrame):
-    df["ret1"] = df["Close"].pct_change()
-    df["ma5"]  = df["Close"].rolling(5).mean()
-    df["ma10"] = df["Close"].rolling(10).mean()
-    df["ma20"] = df["Close"].rolling(20).mean()
-    df["momentum10"] = df["Close"].pct_change(10)
+    for name, factor in TECHNICAL_FACTORS.items():
+        df[name] = factor(df)
     return df
@@ -1,4 +1,12 @@
+from .registry import Factor
+
+VOL_FACTORS = {
+    "vol20": Factor(lambda c: c["ret1"].rolling(20).std(), ["ret1"], lookback=19),
+    "atr": Factor(lambda c: (c["High"] - c["Low"]).rolling(14).mean(), ["High", "Low"], lookback=13),
+}
+
+
 def add_vol_factors(df):
-    df["vol20"] = df["ret1"].rolling(20).std()
-    df["atr"] = (df["High"] - df["Low"]).rolling(14).mean()
+    for name, factor in VOL_FACTORS.items():
+        df[name] = factor(df)
     return df
@@ -1,3 +1,11 @@
+from .registry import Factor
+
+VOLUME_FACTORS = {
+    "vol_spike": Factor(lambda c: c["Volume"] / c["Volume"].rolling(20).mean(), ["Volume"], lookback=19),
+}
+
+
 def add_volume_factors(df):
-    df["vol_spike"] = df["Volume"] / df["Volume"].rolling(20).mean()
+    for name, factor in VOLUME_FACTORS.items():
+        df[name] = factor(df)
     return df
@@ -1,12 +1,20 @@
+import os
+
 import numpy as np
 import pandas as pd
 from torch.utils.data import Dataset
 
 
 class MetaSequenceDataset(Dataset):
+    """
+    因子 / 策略信号 / 标签在构造时一次性转成连续的 float32 数组，
+    __getitem__ 只做切片（零拷贝视图），不再每个样本走一遍 pandas。
 
+    mmap_dir 不为空时，三个数组写成 .npy 后以只读 memmap 打开，
+    多个 DataLoader worker 共享同一份页缓存，不各自复制。
+    """
 
-    def __init__(self, df, strat_cols, factor_cols, horizon=1, seq_len=32):
+    def __init__(self, df, strat_cols, factor_cols, horizon=1, seq_len=32, mmap_dir=None):
 
         self.seq_len = seq_len
         self.horizon = horizon
@@ -14,22 +22,52 @@ class MetaSequenceDataset(Dataset):
         self.strat_cols = strat_cols
         self.factor_cols = factor_cols
 
-        self.df = df.reset_index(drop=True)
+        factors = np.ascontiguousarray(df[factor_cols].to_numpy(dtype=np.float32))
+        signals = np.ascontiguousarray(df[strat_cols].to_numpy(dtype=np.float32))
+        y = df["Close"].pct_change().shift(-horizon).fillna(0).to_numpy(dtype=np.float32)
+
+        if mmap_dir is not None:
+            factors, signals, y = self._to_mmap(mmap_dir, factors, signals, y)
+
+        self.factors = factors
+        self.signals = signals
+        self.y = y
 
-        self.y = df["Close"].pct_change().shift(-horizon).fillna(0).values
+    @staticmethod
+    def _to_mmap(mmap_dir, *arrays):
+        os.makedirs(mmap_dir, exist_ok=True)
+        out = []
+        for name, arr in zip(["factors", "signals", "y"], arrays):
+            path = os.path.join(mmap_dir, f"{name}.npy")
+            np.save(path, arr)
+            out.append(np.load(path, mmap_mode="r"))
+        return out
+
+    @classmethod
+    def from_mmap(cls, mmap_dir, strat_cols, factor_cols, horizon=1, seq_len=32):
+        """直接打开之前 mmap_dir 写出的数组，不需要原始 DataFrame。"""
+        self = cls.__new__(cls)
+        self.seq_len = seq_len
+        self.horizon = horizon
+        self.strat_cols = strat_cols
+        self.factor_cols = factor_cols
+        self.factors, self.signals, self.y = (
+            np.load(os.path.join(mmap_dir, f"{name}.npy"), mmap_mode="r")
+            for name in ["factors", "signals", "y"]
+        )
+        return self
 
     def __len__(self):
-        return len(self.df) - self.seq_len - self.horizon
+        return len(self.factors) - self.seq_len - self.horizon
 
     def __getitem__(self, idx):
 
-        seq = self.df[self.factor_cols].iloc[idx : idx + self.seq_len].values
-        seq = seq.astype(np.float32)
-
+        # (seq_len, n_factors) 的行切片，是 self.factors 的视图
+        seq = self.factors[idx : idx + self.seq_len]
 
-        signals_now = self.df[self.strat_cols].iloc[idx + self.seq_len].values.astype(np.float32)
+        signals_now = self.signals[idx + self.seq_len]
 
         # label (float32)
-        y = np.float32(self.y[idx + self.seq_len])
+        y = self.y[idx + self.seq_len]
 
         return seq, signals_now, y
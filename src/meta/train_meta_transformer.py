@@ -1,9 +1,9 @@
 import torch
 import pandas as pd
 
-from src.config import DATA_PATH
+from src.config import DATA_PATH, PROFILE, PROFILE_DIR
 from src.data.loader import load_data
-from src.factors.factor_engine import generate_factors
+from src.strategies.context import get_context
 
 from src.strategies.ma import ma_strategy
 from src.strategies.rsi import rsi_strategy
@@ -12,14 +12,18 @@ from src.strategies.bollinger import bollinger_strategy
 
 from src.meta.dataset import MetaSequenceDataset
 from src.meta.trainer import train_meta_transformer
+from src.utils.profiler import span, enable_profiling, disable_profiling
 
 
 def main():
     print(">>> 加载原始数据")
-    df_raw = load_data(DATA_PATH)
+    with span("load") as sp:
+        df_raw = load_data(DATA_PATH)
+        sp.rows = len(df_raw)
 
     print(">>> 生成因子")
-    df_fac = generate_factors(df_raw.copy())
+    ctx = get_context()
+    df_fac = ctx.factors(df_raw).copy()
 
     print(">>> 计算基础策略信号 (MA / RSI / MACD / Bollinger)")
 
@@ -31,8 +35,8 @@ def main():
     }
 
     for name, func in strat_funcs.items():
-        df_sig = func(df_fac.copy())
-        df_fac[f"sig_{name}"] = df_sig["signal"]
+        with span(f"strategy:{name}", rows=len(df_fac)):
+            df_fac[f"sig_{name}"] = ctx.signal(df_fac, func)
 
     df_fac = df_fac.dropna().copy()
 
@@ -47,28 +51,30 @@ def main():
     print("使用的因子列:", factor_cols)
     print("使用的策略列:", strat_cols)
 
-    dataset = MetaSequenceDataset(
-        df_fac,
-        strat_cols=strat_cols,
-        factor_cols=factor_cols,
-        seq_len=32,
-        horizon=1,
-    )
+    with span("dataset", rows=len(df_fac)):
+        dataset = MetaSequenceDataset(
+            df_fac,
+            strat_cols=strat_cols,
+            factor_cols=factor_cols,
+            seq_len=32,
+            horizon=1,
+        )
 
     print(f"Dataset 长度: {len(dataset)} 样本")
 
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f">>> 使用设备: {device}")
 
-    model = train_meta_transformer(
-        dataset,
-        num_features=len(factor_cols),
-        num_strats=len(strat_cols),
-        lr=1e-3,
-        batch_size=32,
-        epochs=8,
-        device=device,
-    )
+    with span("train", rows=len(dataset), device=device):
+        model = train_meta_transformer(
+            dataset,
+            num_features=len(factor_cols),
+            num_strats=len(strat_cols),
+            lr=1e-3,
+            batch_size=32,
+            epochs=8,
+            device=device,
+        )
 
     save_path = "models/meta_transformer.pt"
     torch.save({
@@ -83,4 +89,13 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    prof = enable_profiling() if PROFILE else None
+    try:
+        with span("train_meta_transformer"):
+            main()
+    finally:
+        disable_profiling()
+        if prof is not None:
+            prof.export_json(f"{PROFILE_DIR}/train_meta_transformer.json")
+            prof.export_chrome_trace(f"{PROFILE_DIR}/train_meta_transformer.trace.json")
+            print(prof.report())
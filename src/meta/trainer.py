@@ -5,6 +5,7 @@ from torch.optim import Adam
 import torch.nn.functional as F
 
 from .transformer_weight import MetaTransformer
+from src.utils.profiler import span
 
 
 def train_meta_transformer(
@@ -26,23 +27,24 @@ def train_meta_transformer(
     opt = Adam(model.parameters(), lr=lr)
 
     for ep in range(epochs):
-        total_loss = 0
-        for X_seq, signals_now, y in loader:
-            X_seq = X_seq.to(device)
-            signals_now = signals_now.to(device)
-            y = y.to(device)
+        with span("epoch", rows=len(dataset), epoch=ep + 1):
+            total_loss = 0
+            for X_seq, signals_now, y in loader:
+                X_seq = X_seq.to(device)
+                signals_now = signals_now.to(device)
+                y = y.to(device)
 
-            weights = model(X_seq)                        # (B, num_strats)
-            ensemble_signal = (weights * signals_now).sum(dim=1)
+                weights = model(X_seq)                        # (B, num_strats)
+                ensemble_signal = (weights * signals_now).sum(dim=1)
 
-            loss = F.mse_loss(ensemble_signal, y)
+                loss = F.mse_loss(ensemble_signal, y)
 
-            opt.zero_grad()
-            loss.backward()
-            opt.step()
+                opt.zero_grad()
+                loss.backward()
+                opt.step()
 
-            total_loss += loss.item()
+                total_loss += loss.item()
 
-        print(f"[Epoch {ep+1}] loss = {total_loss:.6f}")
+            print(f"[Epoch {ep+1}] loss = {total_loss:.6f}")
 
     return model
@@ -0,0 +1,285 @@
+# src/optimizer/adaptive.py
+"""
+Adaptive parameter search: hyperband over data prefixes.
+
+The data budgets (rungs) are prefixes of the history: min_rows, min_rows*eta,
+... up to the full history. Each bracket runs successive halving: it scores
+its configurations (Sharpe) on its starting rung, promotes the best 1/eta to
+the next, eta-times longer prefix, and so on until the survivors run on the
+full history. As in hyperband, brackets cycle through the starting rung: the
+first starts on min_rows with n_configs configurations, later ones start on
+longer prefixes with fewer configurations, which hedges against strategies
+whose short-prefix Sharpe says little about the full history. From the second
+bracket on, part of the configurations are drawn by perturbing the best
+full-history configurations found so far, so the search concentrates around
+good regions.
+
+Evaluations reuse the grid-search worker pipeline (_run_evaluations), so
+constraints, rolling-window caching and process-pool parallelism behave the
+same as in grid_search().
+"""
+import math
+import numbers
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.strategies import STRATEGY_REGISTRY, STRATEGY_PARAM_MAP
+from src.utils.profiler import span
+
+from .grid_search import PARAM_CONSTRAINTS, _run_evaluations
+
+
+# ============================================================
+# Search space
+# ============================================================
+def _is_int_range(low, high) -> bool:
+    return isinstance(low, numbers.Integral) and isinstance(high, numbers.Integral)
+
+
+class ParamSampler:
+    """
+    param_space: {参数名: 候选列表 | (low, high)}
+      - 列表：离散取值（按列表顺序视为有序，扰动时取相邻值）
+      - (low, high)：两端都是整数（含 np.int64）时为整数区间，否则为浮点区间（闭区间）
+    """
+
+    def __init__(self, strategy_name: str, param_space: dict, rng=None, max_tries: int = 100):
+        if not param_space:
+            raise ValueError("param_space 不能为空")
+        for name, spec in param_space.items():
+            if isinstance(spec, tuple):
+                if len(spec) != 2 or spec[0] > spec[1]:
+                    raise ValueError(f"参数 '{name}' 的区间需要是 (low, high)，得到 {spec}")
+            elif not list(spec):
+                raise ValueError(f"参数 '{name}' 的候选列表为空")
+
+        self.param_space = {
+            k: v if isinstance(v, tuple) else list(v) for k, v in param_space.items()
+        }
+        self.rng = np.random.default_rng(rng)
+        self.max_tries = max_tries
+        self.check = PARAM_CONSTRAINTS.get(strategy_name)
+        self.defaults = STRATEGY_PARAM_MAP.get(strategy_name, {})
+
+    def _valid(self, p: dict) -> bool:
+        return self.check is None or self.check({**self.defaults, **p})
+
+    def _draw(self, name):
+        spec = self.param_space[name]
+        if isinstance(spec, list):
+            return spec[self.rng.integers(len(spec))]
+        low, high = spec
+        if _is_int_range(low, high):
+            return int(self.rng.integers(low, high + 1))
+        return float(self.rng.uniform(low, high))
+
+    def _perturb(self, name, value, scale: float):
+        spec = self.param_space[name]
+        if isinstance(spec, list):
+            i = spec.index(value) if value in spec else self.rng.integers(len(spec))
+            step = int(self.rng.choice([-1, 1]))
+            return spec[int(np.clip(i + step, 0, len(spec) - 1))]
+
+        low, high = spec
+        value = value + self.rng.normal(0.0, scale * (high - low))
+        value = min(max(value, low), high)
+        if _is_int_range(low, high):
+            return int(round(value))
+        return float(value)
+
+    def sample(self) -> dict:
+        for _ in range(self.max_tries):
+            p = {name: self._draw(name) for name in self.param_space}
+            if self._valid(p):
+                return p
+        raise ValueError("param_space 中找不到满足约束的参数组合")
+
+    def neighbour(self, parent: dict, prob: float = 0.5, scale: float = 0.1) -> dict:
+        """在 parent 附近采样：每个参数以概率 prob 扰动，至少扰动一个。"""
+        names = list(self.param_space)
+        for _ in range(self.max_tries):
+            mask = self.rng.random(len(names)) < prob
+            mask[self.rng.integers(len(names))] = True
+            p = {
+                name: self._perturb(name, parent[name], scale) if m else parent[name]
+                for name, m in zip(names, mask)
+            }
+            if self._valid(p):
+                return p
+        return self.sample()
+
+
+# ============================================================
+# Hyperband
+# ============================================================
+def _key(params: dict):
+    return tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+
+def adaptive_search(
+    strategy_name: str,
+    param_space: dict,
+    df_raw: pd.DataFrame,
+    initial_capital: float = 10_000.0,
+    commission=0.0005,
+    slippage=0.0002,
+    freq: str = "1d",
+    n_configs: int = 81,
+    eta: int = 3,
+    min_rows: int = 500,
+    n_brackets: int | None = None,
+    exploit_fraction: float = 0.5,
+    max_evals: int | None = None,
+    time_budget: float | None = None,
+    seed=None,
+    n_jobs: int = 1,
+):
+    """
+    :param param_space: 见 ParamSampler；未列出的参数取 STRATEGY_PARAM_MAP 默认值
+    :param n_configs: 第一个 bracket（从 min_rows 起步）的参数组数；第 b 个 bracket
+                      从第 b % R 轮（R 为轮数）起步，组数按 hyperband 比例缩小
+    :param eta: 每轮保留 1/eta，数据长度放大 eta 倍
+    :param min_rows: 最短数据前缀（需覆盖策略 warm-up）
+    :param n_brackets: bracket 个数；None 时只受 max_evals / time_budget 限制
+                       （两者也都为 None 时跑 1 个）
+    :param exploit_fraction: 第二个 bracket 起，由最优配置扰动生成的比例（其余随机）
+    :param max_evals: 回测次数上限（任意数据长度都记 1 次）；bracket 会按剩余预算缩小
+    :param time_budget: 墙钟时间上限（秒），每轮开始前检查
+    :param n_jobs: 传给 _run_evaluations 的进程数
+    :return: (best, res_df)。res_df 每行是一次评估：参数 + bracket / rung / rows / sharpe；
+             best 取全量数据上 Sharpe 最高的配置
+    """
+    if strategy_name not in STRATEGY_REGISTRY:
+        raise ValueError(
+            f"未知策略 '{strategy_name}', 可选: {list(STRATEGY_REGISTRY.keys())}"
+        )
+    if eta < 2:
+        raise ValueError(f"eta 必须 >= 2，得到 {eta}")
+
+    base_params = dict(STRATEGY_PARAM_MAP.get(strategy_name, {}))
+    if base_params:
+        unknown = [k for k in param_space if k not in base_params]
+        if unknown:
+            raise ValueError(
+                f"策略 '{strategy_name}' 没有参数 {unknown}, 可选: {list(base_params.keys())}"
+            )
+
+    if n_brackets is None and max_evals is None and time_budget is None:
+        n_brackets = 1
+
+    engine_kwargs = {
+        "initial_capital": initial_capital,
+        "commission": commission,
+        "slippage": slippage,
+    }
+
+    n_total = len(df_raw)
+    # 数据长度：min_rows, min_rows*eta, ... 最后一轮是全量
+    rung_rows = []
+    rows = min(max(min_rows, 1), n_total)
+    while rows < n_total:
+        rung_rows.append(rows)
+        rows *= eta
+    rung_rows.append(n_total)
+    s_max = len(rung_rows) - 1
+
+    sampler = ParamSampler(strategy_name, param_space, rng=seed)
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+    cache = {}        # (参数, rows) -> sharpe，重复配置不重复回测
+    records = []
+    full_scores = {}  # 参数 key -> (sharpe, params)，全量数据上的结果
+    n_evals = 0
+
+    def out_of_budget():
+        if max_evals is not None and n_evals >= max_evals:
+            return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    bracket = 0
+    while (n_brackets is None or bracket < n_brackets) and not out_of_budget():
+
+        # ---------- 本 bracket 的起步轮次与初始配置 ----------
+        # hyperband：halvings 越少起步的数据越长、配置越少（halvings = s_max 即从 min_rows 起步）
+        start = bracket % (s_max + 1)
+        halvings = s_max - start
+        n_this = max(1, math.ceil(n_configs * (s_max + 1) / (halvings + 1) / eta ** start))
+        # 一个初始配置在本 bracket 里平均消耗的评估次数：1 + 1/eta + ... + 1/eta^halvings
+        cost_per_config = sum(eta ** -k for k in range(halvings + 1))
+
+        # 有 max_evals 时缩小本 bracket，保证剩余预算能把幸存者跑到全量数据
+        if max_evals is not None:
+            n_this = min(n_this, int((max_evals - n_evals) / cost_per_config))
+            if n_this < 1:
+                break
+
+        n_exploit = int(n_this * exploit_fraction) if full_scores else 0
+        ranked = sorted(full_scores.values(), key=lambda t: t[0], reverse=True)
+        parents = [p for _, p in ranked[:max(1, n_this // eta)]]
+
+        configs = [sampler.neighbour(parents[i % len(parents)]) for i in range(n_exploit)]
+        configs += [sampler.sample() for _ in range(n_this - n_exploit)]
+
+        unique = {}
+        for p in configs:
+            unique.setdefault(_key(p), p)
+        configs = list(unique.values())
+
+        with span("bracket", bracket=bracket, configs=len(configs), start_rows=rung_rows[start]):
+            for rung, rows in enumerate(rung_rows[start:], start=start):
+                if not configs or out_of_budget():
+                    break
+
+                if max_evals is not None:
+                    # 取整误差导致的超额：硬截断
+                    configs = configs[:max_evals - n_evals]
+
+                todo = [p for p in configs if (_key(p), rows) not in cache]
+                with span("rung", rows=rows, rung=rung, configs=len(todo)):
+                    sharpes = _run_evaluations(
+                        df_raw.iloc[:rows],
+                        strategy_name,
+                        todo,
+                        base_params,
+                        engine_kwargs,
+                        freq,
+                        n_jobs=n_jobs,
+                    )
+                n_evals += len(todo)
+                for p, s in zip(todo, sharpes):
+                    s = float(s)
+                    cache[(_key(p), rows)] = s if np.isfinite(s) else -np.inf
+
+                scores = [cache[(_key(p), rows)] for p in configs]
+                for p, s in zip(configs, scores):
+                    records.append({**p, "bracket": bracket, "rung": rung, "rows": rows, "sharpe": s})
+                    if rows == n_total:
+                        full_scores[_key(p)] = (s, p)
+
+                # 保留前 1/eta 进入下一轮
+                keep = max(1, len(configs) // eta)
+                order = np.argsort(scores, kind="stable")[::-1][:keep]
+                configs = [configs[i] for i in order]
+
+        bracket += 1
+
+    if not records:
+        raise ValueError("预算内没有完成任何评估")
+
+    res_df = pd.DataFrame(records)
+    res_df["sharpe"] = res_df["sharpe"].replace(-np.inf, np.nan)
+
+    if full_scores:
+        score, p = max(full_scores.values(), key=lambda t: t[0])
+        best = {**p, "sharpe": score if np.isfinite(score) else np.nan, "rows": n_total}
+    else:
+        # 预算用完时还没有配置跑到全量：退而取最长前缀上的最优
+        # （全部为 NaN 时 idxmax 会报错，取第一行）
+        top = res_df[res_df["rows"] == res_df["rows"].max()]
+        best_idx = top["sharpe"].idxmax() if top["sharpe"].notna().any() else top.index[0]
+        best = top.loc[best_idx].to_dict()
+
+    res_df = res_df.sort_values(["rows", "sharpe"], ascending=False).reset_index(drop=True)
+    return best, res_df
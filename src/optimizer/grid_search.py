@@ -1,12 +1,17 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
-from src.backtester.engine import run_backtest
+from src.backtester.engine import BacktestEngine
 from src.backtester.metrics import sharpe_ratio
-from src.strategies.ma import ma_strategy
+from src.strategies import STRATEGY_REGISTRY, STRATEGY_PARAM_MAP
+from src.utils.rolling import RollingWindowCache, use_rolling_cache
+from src.utils.profiler import span
 
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
 
 
 def _ensure_dir(path: str):
@@ -15,50 +20,249 @@ def _ensure_dir(path: str):
         os.makedirs(folder)
 
 
-def grid_search_ma(
+# ============================================================
+# 参数约束：不合法的组合直接跳过，不浪费一次回测
+# ============================================================
+def _ma_valid(p):
+    return p["short_window"] < p["long_window"]
+
+
+def _rsi_valid(p):
+    return p["rsi_low"] < p["rsi_high"]
+
+
+def _macd_valid(p):
+    return p["fast"] < p["slow"]
+
+
+def _meta_regime_valid(p):
+    return (
+        p["trend_ma_short"] < p["trend_ma_long"]
+        and p["ma_short_window"] < p["ma_long_window"]
+    )
+
+
+PARAM_CONSTRAINTS = {
+    "ma": _ma_valid,
+    "rsi": _rsi_valid,
+    "macd": _macd_valid,
+    "meta_regime": _meta_regime_valid,
+}
+
+
+# ============================================================
+# Worker：每个进程只接收一次 df_raw，之后只传参数组合
+# ============================================================
+_WORKER_STATE = {}
+
+
+def _init_worker(df_raw, strategy_name, base_params, engine_kwargs, freq):
+    _WORKER_STATE["df_raw"] = df_raw
+    _WORKER_STATE["strategy"] = STRATEGY_REGISTRY[strategy_name]
+    _WORKER_STATE["base_params"] = base_params
+    _WORKER_STATE["engine"] = BacktestEngine(**engine_kwargs)
+    _WORKER_STATE["freq"] = freq
+    # 同一份价格序列的 rolling mean/std 在整个扫描中只算一次
+    _WORKER_STATE["rolling"] = RollingWindowCache(df_raw["Close"])
+
+
+def _evaluate(params: dict) -> float:
+    st = _WORKER_STATE
+    with span("evaluate", **params):
+        with span("strategy"), use_rolling_cache(st["rolling"]):
+            df_sig = st["strategy"](st["df_raw"], **{**st["base_params"], **params})
+        # 只需要 net_ret 算 Sharpe：lean 模式不 copy 整张表
+        df_bt = st["engine"].run(df_sig, columns=["net_ret"])
+        with span("metrics"):
+            return sharpe_ratio(df_bt, freq=st["freq"])
+
+
+def _expand_grid(strategy_name: str, param_grid: dict) -> list:
+    names = list(param_grid.keys())
+    combos = [
+        dict(zip(names, values))
+        for values in itertools.product(*(param_grid[k] for k in names))
+    ]
+
+    check = PARAM_CONSTRAINTS.get(strategy_name)
+    if check is not None:
+        defaults = STRATEGY_PARAM_MAP.get(strategy_name, {})
+        combos = [p for p in combos if check({**defaults, **p})]
+
+    return combos
+
+
+def _run_evaluations(
     df_raw: pd.DataFrame,
-    short_range=[5, 10, 20],
-    long_range=[50, 100, 150],
+    strategy_name: str,
+    combos: list,
+    base_params: dict,
+    engine_kwargs: dict,
+    freq: str,
+    n_jobs: int = 1,
+    chunksize: int | None = None,
+) -> list:
+    """
+    对每组参数跑 策略 → 回测 → Sharpe，返回与 combos 同序的 Sharpe 列表。
+    n_jobs == 1 时在当前进程串行执行；否则分发到进程池。
+    """
+    init_args = (df_raw, strategy_name, base_params, engine_kwargs, freq)
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(combos)) if combos else 1
+
+    if n_jobs == 1:
+        _init_worker(*init_args)
+        try:
+            return [_evaluate(p) for p in combos]
+        finally:
+            _WORKER_STATE.clear()
+
+    if chunksize is None:
+        # 每个 worker 大约分到 4 块，兼顾负载均衡和 IPC 次数
+        chunksize = max(1, len(combos) // (n_jobs * 4))
+
+    # 子进程里的 span 不会回传，这里只记录整体耗时
+    with span("process_pool", rows=len(combos), n_jobs=n_jobs, chunksize=chunksize):
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=init_args,
+        ) as pool:
+            return list(pool.map(_evaluate, combos, chunksize=chunksize))
+
+
+def _save_heatmap(res_df: pd.DataFrame, index: str, columns: str, title: str, save_path: str):
+    with span("heatmap"):
+        _plot_heatmap(res_df, index, columns, title, save_path)
+
+
+def _plot_heatmap(res_df: pd.DataFrame, index: str, columns: str, title: str, save_path: str):
+    _ensure_dir(save_path)
+    pivot = res_df.pivot(index=index, columns=columns, values="sharpe")
+
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(
+        pivot,
+        annot=True,
+        cmap="viridis",
+        fmt=".3f",
+        cbar_kws={"label": "Sharpe Ratio"},
+    )
+    plt.title(title)
+    plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    plt.close()
+
+    print(f"Saved heatmap to: {save_path}")
+
+
+# ============================================================
+# 通用 Grid Search（任意已注册策略）
+# ============================================================
+def grid_search(
+    strategy_name: str,
+    param_grid: dict,
+    df_raw: pd.DataFrame,
+    initial_capital: float = 10_000.0,
     commission=0.0005,
     slippage=0.0002,
+    freq: str = "1d",
+    n_jobs: int = 1,
+    chunksize: int | None = None,
     save_path: str = None,
 ):
-    results = []
+    """
+    对 STRATEGY_REGISTRY 中任意策略做参数网格搜索，按 Sharpe 降序排名。
+
+    :param param_grid: {参数名: 候选值列表}，未列出的参数取 STRATEGY_PARAM_MAP 默认值
+    :param n_jobs: 进程数；1 = 串行，None / -1 = 全部 CPU
+    :param chunksize: 每次分发给 worker 的参数组数，None 自动估计
+    :param save_path: 恰好扫描两个参数时，保存 Sharpe 热力图
+    :return: (best, res_df)，res_df 每行是一组参数 + sharpe
+    """
+    if strategy_name not in STRATEGY_REGISTRY:
+        raise ValueError(
+            f"未知策略 '{strategy_name}', 可选: {list(STRATEGY_REGISTRY.keys())}"
+        )
 
-    for short in short_range:
-        for long in long_range:
-            if short >= long:
-                continue
+    base_params = dict(STRATEGY_PARAM_MAP.get(strategy_name, {}))
+    if base_params:
+        unknown = [k for k in param_grid if k not in base_params]
+        if unknown:
+            raise ValueError(
+                f"策略 '{strategy_name}' 没有参数 {unknown}, 可选: {list(base_params.keys())}"
+            )
 
-            df_sig = ma_strategy(df_raw, short=short, long=long)
-            df_bt = run_backtest(df_sig, commission=commission, slippage=slippage)
-            sharpe = sharpe_ratio(df_bt)
+    with span("expand_grid"):
+        combos = _expand_grid(strategy_name, param_grid)
+    if not combos:
+        raise ValueError("param_grid 没有合法的参数组合")
 
-            results.append({
-                "short": short,
-                "long": long,
-                "sharpe": sharpe
-            })
+    engine_kwargs = {
+        "initial_capital": initial_capital,
+        "commission": commission,
+        "slippage": slippage,
+    }
 
-    res_df = pd.DataFrame(results).sort_values("sharpe", ascending=False).reset_index(drop=True)
+    with span(f"grid_search:{strategy_name}", rows=len(df_raw), combos=len(combos)):
+        sharpes = _run_evaluations(
+            df_raw,
+            strategy_name,
+            combos,
+            base_params,
+            engine_kwargs,
+            freq,
+            n_jobs=n_jobs,
+            chunksize=chunksize,
+        )
+
+    res_df = pd.DataFrame(combos)
+    res_df["sharpe"] = np.asarray(sharpes, dtype=float)
+    res_df = res_df.sort_values("sharpe", ascending=False).reset_index(drop=True)
     best = res_df.iloc[0].to_dict()
 
-    if save_path:
-        _ensure_dir(save_path)
-        pivot = res_df.pivot(index="short", columns="long", values="sharpe")
-
-        plt.figure(figsize=(8, 6))
-        sns.heatmap(
-            pivot,
-            annot=True,
-            cmap="viridis",
-            fmt=".3f",
-            cbar_kws={"label": "Sharpe Ratio"},
+    if save_path and len(param_grid) == 2:
+        index, columns = list(param_grid.keys())
+        _save_heatmap(
+            res_df,
+            index=index,
+            columns=columns,
+            title=f"{strategy_name} Parameter Grid Search (Sharpe)",
+            save_path=save_path,
         )
-        plt.title("MA Parameter Grid Search (Sharpe)")
-        plt.savefig(save_path, dpi=300, bbox_inches="tight")
-        plt.close()
 
-        print(f"Saved heatmap to: {save_path}")
+    return best, res_df
+
+
+def grid_search_ma(
+    df_raw: pd.DataFrame,
+    short_range=[5, 10, 20],
+    long_range=[50, 100, 150],
+    commission=0.0005,
+    slippage=0.0002,
+    save_path: str = None,
+    n_jobs: int = 1,
+):
+    best, res_df = grid_search(
+        "ma",
+        {"short_window": short_range, "long_window": long_range},
+        df_raw,
+        commission=commission,
+        slippage=slippage,
+        n_jobs=n_jobs,
+    )
+
+    res_df = res_df.rename(columns={"short_window": "short", "long_window": "long"})
+    best = res_df.iloc[0].to_dict()
+
+    if save_path:
+        _save_heatmap(
+            res_df,
+            index="short",
+            columns="long",
+            title="MA Parameter Grid Search (Sharpe)",
+            save_path=save_path,
+        )
 
     return best, res_df
@@ -14,6 +14,8 @@ from .meta_transformer import meta_transformer_strategy
 
 from .params import STRATEGY_PARAM_MAP
 
+from src.utils.profiler import span
+
 
 STRATEGY_REGISTRY = {
     "ma": ma_strategy,
@@ -33,7 +35,8 @@ STRATEGY_REGISTRY = {
 def apply_strategy(df, name: str, **params):
     if name not in STRATEGY_REGISTRY:
         raise ValueError(f"未知策略 '{name}', 可选: {list(STRATEGY_REGISTRY.keys())}")
-    return STRATEGY_REGISTRY[name](df, **params)
+    with span(f"strategy:{name}", rows=len(df)):
+        return STRATEGY_REGISTRY[name](df, **params)
 
 
 __all__ = [
@@ -1,5 +1,8 @@
 import pandas as pd
 
+from src.utils.rolling import rolling_mean, rolling_std
+from .signal import hold_last_nonzero
+
 def bollinger_strategy(
     df: pd.DataFrame,
     window: int = 20,
@@ -9,8 +12,8 @@ def bollinger_strategy(
     df = df.copy()
     price = df[price_col]
 
-    ma = price.rolling(window).mean()
-    std = price.rolling(window).std()
+    ma = rolling_mean(price, window)
+    std = rolling_std(price, window)
 
     df["bb_mid"]   = ma
     df["bb_upper"] = ma + num_std * std
@@ -22,6 +25,6 @@ def bollinger_strategy(
     df.loc[price > df["bb_upper"], "signal_raw"] = -1
 
 
-    df["signal"] = df["signal_raw"].replace(0, pd.NA).ffill().fillna(0).astype(float)
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
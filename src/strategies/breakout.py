@@ -1,4 +1,5 @@
 import pandas as pd
+from .signal import hold_last_nonzero
 
 def breakout_strategy(
     df: pd.DataFrame,
@@ -16,6 +17,6 @@ def breakout_strategy(
     df.loc[df["Close"] > df["highest"], "signal_raw"] = 1
     df.loc[df["Close"] < df["lowest"],  "signal_raw"] = -1
 
-    df["signal"] = df["signal_raw"].replace(0, pd.NA).ffill().fillna(0).astype(float)
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
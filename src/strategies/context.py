@@ -0,0 +1,107 @@
+# src/strategies/context.py
+"""
+Memoising signal / factor context shared by the meta strategies.
+
+Base strategy signals and factor tables are pure functions of the bar data
+and their parameters, so inside one run each (data fingerprint, function,
+parameters) combination only needs computing once. Open a context with
+``with compute_context():`` around a run; meta strategies and the training
+script fetch signals and factors through ``get_context()``.
+"""
+import hashlib
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from src.factors.factor_engine import generate_factors
+
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def data_fingerprint(df: pd.DataFrame, extra_cols=()) -> str:
+    """
+    索引 + OHLCV 列内容的哈希。只看行情数据，后加的因子 / 信号列不影响；
+    策略读取其他列（price_col）时用 extra_cols 把该列也算进去。
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().view(np.uint8))
+    for col in list(BAR_COLUMNS) + [c for c in extra_cols if c not in BAR_COLUMNS]:
+        if col in df.columns:
+            h.update(col.encode("utf-8"))
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).view(np.uint8))
+    return h.hexdigest()
+
+
+def _freeze(params: dict):
+    return tuple(sorted((k, repr(v)) for k, v in params.items()))
+
+
+def _func_key(func) -> str:
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+class ComputeContext:
+
+    def __init__(self):
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key, compute):
+        if key in self._cache:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def signal(self, df: pd.DataFrame, strategy, **params) -> pd.Series:
+        """
+        底层策略的 signal 列。strategy 可以是函数或 STRATEGY_REGISTRY 中的名字。
+        返回的 Series 是缓存对象本身，调用方不要原地修改。
+        """
+        if isinstance(strategy, str):
+            from . import STRATEGY_REGISTRY
+            strategy = STRATEGY_REGISTRY[strategy]
+
+        extra = [params["price_col"]] if "price_col" in params else []
+        key = ("signal", data_fingerprint(df, extra), _func_key(strategy), _freeze(params))
+        return self._get(key, lambda: strategy(df.copy(), **params)["signal"])
+
+    def factors(self, df: pd.DataFrame, **params) -> pd.DataFrame:
+        """
+        generate_factors(df, **params) 的结果。
+        返回的 DataFrame 是缓存对象本身，需要加列时先 .copy()。
+        """
+        key = ("factors", data_fingerprint(df), _freeze(params))
+        return self._get(key, lambda: generate_factors(df.copy(), **params))
+
+    def clear(self):
+        self._cache.clear()
+
+
+_ACTIVE = []
+
+
+@contextmanager
+def compute_context():
+    """
+    打开（或复用已打开的）共享计算上下文。
+    嵌套调用复用最外层的上下文，整个 run 里同样的计算只做一次。
+    """
+    if _ACTIVE:
+        yield _ACTIVE[-1]
+        return
+
+    ctx = ComputeContext()
+    _ACTIVE.append(ctx)
+    try:
+        yield ctx
+    finally:
+        _ACTIVE.remove(ctx)
+
+
+def get_context() -> ComputeContext:
+    """当前打开的上下文；没有时返回一个只在本次调用内有效的新上下文。"""
+    return _ACTIVE[-1] if _ACTIVE else ComputeContext()
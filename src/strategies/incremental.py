@@ -0,0 +1,291 @@
+# src/strategies/incremental.py
+"""
+Incremental (bar-by-bar) versions of the base strategies.
+
+Each strategy keeps only the rolling state it needs (ring buffers with running
+sums, monotonic deques, EMA values), so on_bar(bar) costs O(1) amortised no
+matter how much history has been seen. Signal rules and latching match the
+batch strategies in this package.
+
+The batch ma / breakout / zscore / momentum strategies back-fill their
+indicators over the first window (using bars that have not happened yet); a
+live strategy cannot, so during that warm-up it emits 0 instead. Use
+IncrementalEngine.prime() on history to continue exactly from the batch state.
+"""
+import math
+from collections import deque
+
+from . import STRATEGY_PARAM_MAP
+
+
+class RollingWindow:
+    """定长窗口的 sum / sum of squares，满窗后才给出 mean / std。"""
+
+    def __init__(self, window: int):
+        self.window = int(window)
+        self.buf = deque(maxlen=self.window)
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self._since_resum = 0
+
+    def push(self, x: float) -> None:
+        if math.isnan(x):
+            # 与 pandas rolling 一致：窗口内有 NaN 就没有结果
+            self.buf.clear()
+            self.sum = self.sumsq = 0.0
+            return
+
+        if len(self.buf) == self.window:
+            old = self.buf[0]
+            self.sum -= old
+            self.sumsq -= old * old
+        self.buf.append(x)
+        self.sum += x
+        self.sumsq += x * x
+
+        # 每 window 次重新求和，抵消长期累加误差（均摊 O(1)）
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self.sum = math.fsum(self.buf)
+            self.sumsq = math.fsum(v * v for v in self.buf)
+            self._since_resum = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.buf) == self.window
+
+    def mean(self) -> float:
+        return self.sum / self.window if self.full else math.nan
+
+    def std(self) -> float:
+        if not self.full or self.window < 2:
+            return math.nan
+        var = (self.sumsq - self.sum * self.sum / self.window) / (self.window - 1)
+        return math.sqrt(max(var, 0.0))
+
+
+class RollingExtreme:
+    """单调队列求窗口 max / min，均摊 O(1)。"""
+
+    def __init__(self, window: int, mode: str = "max"):
+        self.window = int(window)
+        self.is_max = mode == "max"
+        self.q = deque()    # (t, value)
+        self.t = -1
+
+    def push(self, x: float) -> None:
+        self.t += 1
+        if self.is_max:
+            while self.q and self.q[-1][1] <= x:
+                self.q.pop()
+        else:
+            while self.q and self.q[-1][1] >= x:
+                self.q.pop()
+        self.q.append((self.t, x))
+        while self.q[0][0] <= self.t - self.window:
+            self.q.popleft()
+
+    def value(self) -> float:
+        if self.t + 1 < self.window:
+            return math.nan
+        return self.q[0][1]
+
+
+class EMA:
+    """pandas ewm(span, adjust=False).mean() 的递推形式。"""
+
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+
+    def push(self, x: float) -> float:
+        if math.isnan(self.value):
+            self.value = x
+        elif not math.isnan(x):
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+# ============================================================
+# 策略
+# ============================================================
+class IncrementalStrategy:
+    name = None
+
+    def __init__(self, **params):
+        # 与 batch 版同名的参数，prime() 用它们跑 batch 策略
+        self.params = params
+        self.signal = 0.0
+
+    def update(self, bar) -> float:
+        """更新内部状态，返回当根 bar 的原始信号 (1 / -1 / 0)。"""
+        raise NotImplementedError
+
+    def on_bar(self, bar) -> float:
+        raw = self.update(bar)
+        # 与 batch 版 hold_last_nonzero 相同：0 沿用上一个非零信号
+        if raw != 0:
+            self.signal = float(raw)
+        return self.signal
+
+
+def _cross(up: bool, down: bool) -> int:
+    return 1 if up else (-1 if down else 0)
+
+
+class IncrementalMA(IncrementalStrategy):
+    name = "ma"
+
+    def __init__(self, short_window: int = 10, long_window: int = 50, price_col: str = "Close"):
+        super().__init__(short_window=short_window, long_window=long_window, price_col=price_col)
+        self.price_col = price_col
+        self.short = RollingWindow(short_window)
+        self.long = RollingWindow(long_window)
+
+    def update(self, bar) -> int:
+        price = float(bar[self.price_col])
+        self.short.push(price)
+        self.long.push(price)
+        ms, ml = self.short.mean(), self.long.mean()
+        return _cross(ms > ml, ms < ml)
+
+
+class IncrementalRSI(IncrementalStrategy):
+    name = "rsi"
+
+    def __init__(self, window: int = 14, rsi_low: int = 30, rsi_high: int = 70, price_col: str = "Close"):
+        super().__init__(window=window, rsi_low=rsi_low, rsi_high=rsi_high, price_col=price_col)
+        self.price_col = price_col
+        self.rsi_low = rsi_low
+        self.rsi_high = rsi_high
+        self.gain = RollingWindow(window)
+        self.loss = RollingWindow(window)
+        self.last_price = None
+
+    def update(self, bar) -> int:
+        price = float(bar[self.price_col])
+        if self.last_price is None:
+            self.last_price = price
+            return 0
+
+        delta = price - self.last_price
+        self.last_price = price
+        self.gain.push(max(delta, 0.0))
+        self.loss.push(max(-delta, 0.0))
+
+        avg_gain, avg_loss = self.gain.mean(), self.loss.mean()
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return 0
+        if avg_loss == 0:
+            if avg_gain == 0:
+                return 0        # 0 / 0 → NaN
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+        return _cross(rsi < self.rsi_low, rsi > self.rsi_high)
+
+
+class IncrementalMACD(IncrementalStrategy):
+    name = "macd"
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal_window: int = 9, price_col: str = "Close"):
+        super().__init__(fast=fast, slow=slow, signal_window=signal_window, price_col=price_col)
+        self.price_col = price_col
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.sig = EMA(signal_window)
+
+    def update(self, bar) -> int:
+        price = float(bar[self.price_col])
+        macd = self.fast.push(price) - self.slow.push(price)
+        macd_signal = self.sig.push(macd)
+        return _cross(macd > macd_signal, macd < macd_signal)
+
+
+class IncrementalBollinger(IncrementalStrategy):
+    name = "bollinger"
+
+    def __init__(self, window: int = 20, num_std: float = 2.0, price_col: str = "Close"):
+        super().__init__(window=window, num_std=num_std, price_col=price_col)
+        self.price_col = price_col
+        self.num_std = num_std
+        self.win = RollingWindow(window)
+
+    def update(self, bar) -> int:
+        price = float(bar[self.price_col])
+        self.win.push(price)
+        ma, std = self.win.mean(), self.win.std()
+        return _cross(price < ma - self.num_std * std, price > ma + self.num_std * std)
+
+
+class IncrementalBreakout(IncrementalStrategy):
+    name = "breakout"
+
+    def __init__(self, high_window: int = 20, low_window: int = 10):
+        super().__init__(high_window=high_window, low_window=low_window)
+        self.highest = RollingExtreme(high_window, "max")
+        self.lowest = RollingExtreme(low_window, "min")
+
+    def update(self, bar) -> int:
+        self.highest.push(float(bar["High"]))
+        self.lowest.push(float(bar["Low"]))
+        close = float(bar["Close"])
+        return _cross(close > self.highest.value(), close < self.lowest.value())
+
+
+class IncrementalMomentum(IncrementalStrategy):
+    name = "momentum"
+
+    def __init__(self, lookback: int = 20):
+        super().__init__(lookback=lookback)
+        self.prices = deque(maxlen=int(lookback) + 1)
+
+    def update(self, bar) -> int:
+        close = float(bar["Close"])
+        self.prices.append(close)
+        if len(self.prices) < self.prices.maxlen:
+            return 0
+        momentum = close - self.prices[0]
+        return _cross(momentum > 0, momentum < 0)
+
+
+class IncrementalZScore(IncrementalStrategy):
+    name = "zscore"
+
+    def __init__(self, window: int = 20, z_entry: float = 2.0):
+        super().__init__(window=window, z_entry=z_entry)
+        self.z_entry = z_entry
+        self.win = RollingWindow(window)
+
+    def update(self, bar) -> int:
+        price = float(bar["Close"])
+        self.win.push(price)
+        ma, std = self.win.mean(), self.win.std()
+        if math.isnan(ma) or math.isnan(std):
+            return 0
+        if std == 0:
+            diff = price - ma
+            zscore = math.nan if diff == 0 else math.copysign(math.inf, diff)
+        else:
+            zscore = (price - ma) / std
+        return _cross(zscore < -self.z_entry, zscore > self.z_entry)
+
+
+INCREMENTAL_REGISTRY = {
+    "ma": IncrementalMA,
+    "rsi": IncrementalRSI,
+    "macd": IncrementalMACD,
+    "bollinger": IncrementalBollinger,
+    "breakout": IncrementalBreakout,
+    "momentum": IncrementalMomentum,
+    "zscore": IncrementalZScore,
+}
+
+
+def make_incremental_strategy(name: str, **params) -> IncrementalStrategy:
+    if name not in INCREMENTAL_REGISTRY:
+        raise ValueError(
+            f"策略 '{name}' 没有增量版本, 可选: {list(INCREMENTAL_REGISTRY.keys())}"
+        )
+    params = {**STRATEGY_PARAM_MAP.get(name, {}), **params}
+    return INCREMENTAL_REGISTRY[name](**params)
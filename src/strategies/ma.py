@@ -1,5 +1,8 @@
 import pandas as pd
 
+from src.utils.rolling import rolling_mean
+from .signal import hold_last_nonzero
+
 def ma_strategy(
     df: pd.DataFrame,
     short_window: int = 10,
@@ -13,8 +16,8 @@ def ma_strategy(
     df = df.copy()
     price = df[price_col]
 
-    df["ma_short"] = price.rolling(short_window).mean()
-    df["ma_long"] = price.rolling(long_window).mean()
+    df["ma_short"] = rolling_mean(price, short_window)
+    df["ma_long"] = rolling_mean(price, long_window)
 
     df[["ma_short", "ma_long"]] = df[["ma_short", "ma_long"]].bfill()
 
@@ -22,6 +25,6 @@ def ma_strategy(
     df.loc[df["ma_short"] > df["ma_long"], "signal_raw"] = 1
     df.loc[df["ma_short"] < df["ma_long"], "signal_raw"] = -1
 
-    df["signal"] = df["signal_raw"].replace(0, pd.NA).ffill().fillna(0).astype(float)
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
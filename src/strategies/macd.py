@@ -1,4 +1,5 @@
 import pandas as pd
+from .signal import hold_last_nonzero
 
 def macd_strategy(
     df: pd.DataFrame,
@@ -22,6 +23,6 @@ def macd_strategy(
     df.loc[df["macd"] < df["macd_signal"], "signal_raw"] = -1
 
 
-    df["signal"] = df["signal_raw"].replace(0, pd.NA).ffill().fillna(0).astype(float)
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
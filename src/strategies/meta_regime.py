@@ -1,9 +1,12 @@
 import pandas as pd
 
+from src.utils.rolling import rolling_mean
+
 from .ma import ma_strategy
 from .breakout import breakout_strategy
 from .momentum import momentum_strategy
 from .zscore import zscore_strategy
+from .signal import hold_last_nonzero
 
 
 def meta_regime_strategy(
@@ -45,8 +48,8 @@ def meta_regime_strategy(
     # ===========================
     # 1) 用 MA 差值判断市场状态
     # ===========================
-    df["trend_ma_short"] = price.rolling(trend_ma_short).mean()
-    df["trend_ma_long"] = price.rolling(trend_ma_long).mean()
+    df["trend_ma_short"] = rolling_mean(price, trend_ma_short)
+    df["trend_ma_long"] = rolling_mean(price, trend_ma_long)
     df[["trend_ma_short", "trend_ma_long"]] = df[
         ["trend_ma_short", "trend_ma_long"]
     ].bfill()
@@ -106,12 +109,6 @@ def meta_regime_strategy(
     df.loc[~df["is_trend"], "signal_raw"] = df.loc[~df["is_trend"], "signal_range"]
 
     # 避免 regime 切换产生 0：向前填充
-    df["signal"] = (
-        df["signal_raw"]
-        .replace(0, pd.NA)
-        .ffill()
-        .fillna(0)
-        .astype(float)
-    )
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
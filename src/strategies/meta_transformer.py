@@ -1,9 +1,11 @@
+import os
+
 import torch
 import pandas as pd
 import numpy as np
 
 from src.meta.transformer_weight import MetaTransformer
-from src.factors.factor_engine import generate_factors
+from src.strategies.context import get_context
 from src.strategies.ma import ma_strategy
 from src.strategies.rsi import rsi_strategy
 from src.strategies.macd import macd_strategy
@@ -11,28 +13,77 @@ from src.strategies.bollinger import bollinger_strategy
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
+# 进程内模型缓存：{(abspath, mtime_ns, device): (model, ckpt)}
+_MODEL_CACHE = {}
+
+
+def _load_model(model_path: str):
+    """
+    读取 checkpoint 并构建模型；同一文件（路径 + mtime）只加载一次。
+    """
+    key = (os.path.abspath(model_path), os.stat(model_path).st_mtime_ns, DEVICE)
+    if key not in _MODEL_CACHE:
+        ckpt = torch.load(model_path, map_location=DEVICE)
+
+        model = MetaTransformer(
+            input_dim=len(ckpt["factor_cols"]),
+            hidden_dim=64,
+            n_heads=4,
+            n_layers=2,
+            out_dim=len(ckpt["strat_cols"])
+        ).to(DEVICE)
+
+        model.load_state_dict(ckpt["state_dict"])
+        model.eval()
+
+        # 文件被覆盖后旧 mtime 的条目不再需要
+        for old in [k for k in _MODEL_CACHE if k[0] == key[0]]:
+            del _MODEL_CACHE[old]
+        _MODEL_CACHE[key] = (model, ckpt)
+
+    return _MODEL_CACHE[key]
+
+
+def _predict_weights(model, X: torch.Tensor, seq_len: int, temperature: float, batch_size: int):
+    """
+    对所有滑动窗口 X[i-seq_len:i] (i = seq_len .. N-1) 批量推理，返回 softmax 权重 (N-seq_len, out_dim)。
+    窗口用 unfold 得到，是 X 的零拷贝视图。
+    """
+    n_windows = len(X) - seq_len
+    # (N-seq_len+1, F, seq_len) → (N-seq_len+1, seq_len, F)，只取前 n_windows 个
+    windows = X.unfold(0, seq_len, 1).transpose(1, 2)[:n_windows]
+
+    preds = torch.empty((n_windows, model.out_dim), dtype=torch.float32)
+    with torch.inference_mode():
+        for start in range(0, n_windows, batch_size):
+            batch = windows[start:start + batch_size].to(DEVICE)
+            w = model(batch)
+            preds[start:start + batch_size] = torch.softmax(w / temperature, dim=-1).cpu()
+
+    return preds.numpy()
+
 
 def meta_transformer_strategy(df: pd.DataFrame,
                               model_path="models/meta_transformer.pt",
                               temperature=1.0,
+                              batch_size=64,
                               **kwargs):
 
-    ckpt = torch.load(model_path, map_location=DEVICE)
+    model, ckpt = _load_model(model_path)
 
-    state_dict = ckpt["state_dict"]
     factor_cols = ckpt["factor_cols"]
     strat_cols = ckpt["strat_cols"]
     seq_len = ckpt["seq_len"]
 
-    input_dim = len(factor_cols)
-    out_dim = len(strat_cols)
-
-    df = generate_factors(df.copy())
+    # 因子 / 底层信号走共享上下文，同一 run 里与训练脚本、其他 meta 策略共用
+    ctx = get_context()
+    # 只算 checkpoint 用到的因子
+    df = ctx.factors(df, columns=factor_cols).copy()
 
-    df["sig_ma"] = ma_strategy(df.copy())["signal"]
-    df["sig_rsi"] = rsi_strategy(df.copy())["signal"]
-    df["sig_macd"] = macd_strategy(df.copy())["signal"]
-    df["sig_bollinger"] = bollinger_strategy(df.copy())["signal"]
+    df["sig_ma"] = ctx.signal(df, ma_strategy)
+    df["sig_rsi"] = ctx.signal(df, rsi_strategy)
+    df["sig_macd"] = ctx.signal(df, macd_strategy)
+    df["sig_bollinger"] = ctx.signal(df, bollinger_strategy)
 
     missing = [c for c in factor_cols + strat_cols if c not in df.columns]
     if missing:
@@ -44,27 +95,7 @@ def meta_transformer_strategy(df: pd.DataFrame,
         df["signal"] = 0
         return df
 
-    model = MetaTransformer(
-        input_dim=input_dim,
-        hidden_dim=64,
-        n_heads=4,
-        n_layers=2,
-        out_dim=out_dim
-    ).to(DEVICE)
-
-    model.load_state_dict(state_dict)
-    model.eval()
-
-    preds = []
-
-    for i in range(seq_len, len(X)):
-        seq = X[i - seq_len:i].unsqueeze(0).to(DEVICE)
-        with torch.no_grad():
-            w = model(seq)
-        w = torch.softmax(w / temperature, dim=-1).cpu().numpy()[0]
-        preds.append(w)
-
-    preds = np.array(preds)
+    preds = _predict_weights(model, X, seq_len, temperature, batch_size)
 
     S = df[strat_cols].iloc[seq_len:].values
 
@@ -1,14 +1,15 @@
 # src/strategies/meta_xgb_weight.py
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
 from xgboost import XGBRegressor
 from sklearn.preprocessing import StandardScaler
 
-# 这里假定你有一个因子引擎，如果还没有，可以先简单写个占位版
-from src.factors.factor_engine import generate_factors
-
+from .context import compute_context, get_context
 from .ma import ma_strategy
 from .rsi import rsi_strategy
 from .macd import macd_strategy
@@ -41,38 +42,36 @@ def _build_meta_dataset(
       feature_cols : 因子列名
     """
 
+    ctx = get_context()
+
     # 1) 因子
-    df_fac = generate_factors(df_raw.copy())
+    df_fac = ctx.factors(df_raw)
     df_fac = df_fac.dropna()
 
-    # 2) 跑底层策略
-    df_ma = ma_strategy(df_raw.copy())
-    df_rsi = rsi_strategy(df_raw.copy())
-    df_macd = macd_strategy(df_raw.copy())
-    df_boll = bollinger_strategy(df_raw.copy())
+    # 2) 跑底层策略（同一 run 内与最终信号共用）
+    sig_ma = ctx.signal(df_raw, ma_strategy)
+    sig_rsi = ctx.signal(df_raw, rsi_strategy)
+    sig_macd = ctx.signal(df_raw, macd_strategy)
+    sig_boll = ctx.signal(df_raw, bollinger_strategy)
 
     # 3) 对齐索引
     idx = (
         df_fac.index
-        .intersection(df_ma.index)
-        .intersection(df_rsi.index)
-        .intersection(df_macd.index)
-        .intersection(df_boll.index)
+        .intersection(sig_ma.index)
+        .intersection(sig_rsi.index)
+        .intersection(sig_macd.index)
+        .intersection(sig_boll.index)
     )
 
     df_fac = df_fac.loc[idx]
-    df_ma = df_ma.loc[idx]
-    df_rsi = df_rsi.loc[idx]
-    df_macd = df_macd.loc[idx]
-    df_boll = df_boll.loc[idx]
 
     close = df_raw.loc[idx, "Close"]
 
     # 4) 计算每条策略的未来收益
-    ret_ma = _compute_forward_return(close, df_ma["signal"], horizon=horizon)
-    ret_rsi = _compute_forward_return(close, df_rsi["signal"], horizon=horizon)
-    ret_macd = _compute_forward_return(close, df_macd["signal"], horizon=horizon)
-    ret_boll = _compute_forward_return(close, df_boll["signal"], horizon=horizon)
+    ret_ma = _compute_forward_return(close, sig_ma.loc[idx], horizon=horizon)
+    ret_rsi = _compute_forward_return(close, sig_rsi.loc[idx], horizon=horizon)
+    ret_macd = _compute_forward_return(close, sig_macd.loc[idx], horizon=horizon)
+    ret_boll = _compute_forward_return(close, sig_boll.loc[idx], horizon=horizon)
 
     df_meta = df_fac.copy()
     df_meta["ret_ma"] = ret_ma
@@ -162,6 +161,149 @@ def _train_meta_xgb_weight_models(
     return models, scaler, feature_cols, idx
 
 
+# ============================================================
+# Walk-forward：分段重训，拼接样本外预测
+# ============================================================
+_XGB_PARAMS = dict(
+    max_depth=4,
+    learning_rate=0.05,
+    subsample=0.9,
+    colsample_bytree=0.9,
+    objective="reg:squarederror",
+)
+
+_WF_STATE = {}
+
+
+def _walk_forward_folds(n, horizon, min_train, refit_every, train_window):
+    """
+    每个 fold: (train_start, train_end, pred_start, pred_end)。
+    训练集截止到 pred_start - horizon，避免标签用到预测区间的价格。
+    """
+    folds = []
+    for pred_start in range(min_train, n, refit_every):
+        train_end = pred_start - horizon
+        train_start = 0 if train_window is None else max(0, train_end - train_window)
+        if train_end - train_start < 2:
+            continue
+        folds.append((train_start, train_end, pred_start, min(pred_start + refit_every, n)))
+    return folds
+
+
+def _init_wf_worker(X, Y):
+    _WF_STATE["X"] = X
+    _WF_STATE["Y"] = Y
+
+
+def _fit_predict_fold(task):
+    """冷启动：单个 (策略, fold) 独立训练。"""
+    j, (t0, t1, p0, p1), n_estimators, random_state, n_threads = task
+    X, Y = _WF_STATE["X"], _WF_STATE["Y"]
+
+    scaler = StandardScaler().fit(X[t0:t1])
+    model = XGBRegressor(
+        n_estimators=n_estimators, n_jobs=n_threads, random_state=random_state, **_XGB_PARAMS
+    )
+    model.fit(scaler.transform(X[t0:t1]), Y[t0:t1, j])
+    return model.predict(scaler.transform(X[p0:p1]))
+
+
+def _fit_predict_chain(task):
+    """
+    热启动：同一策略的 fold 依次训练，每次在上一 fold 的 booster 上继续加树。
+    rolling window 下，链起点 fold 的训练数据全部滑出窗口后冷启动一条新链，
+    丢掉在过期数据上训练的树（expanding window 时一条链走到底）。
+    """
+    j, folds, n_estimators, refit_estimators, random_state, n_threads = task
+    X, Y = _WF_STATE["X"], _WF_STATE["Y"]
+
+    preds = []
+    booster = None
+    for t0, t1, p0, p1 in folds:
+        if booster is not None and t0 >= chain_end:
+            booster = None
+        if booster is None:
+            # 树模型对单调缩放不敏感；同一条链共用起点 fold 的 scaler，保证各 fold 特征尺度一致
+            scaler = StandardScaler().fit(X[t0:t1])
+            chain_end = t1
+        model = XGBRegressor(
+            n_estimators=n_estimators if booster is None else refit_estimators,
+            n_jobs=n_threads,
+            random_state=random_state,
+            **_XGB_PARAMS,
+        )
+        model.fit(scaler.transform(X[t0:t1]), Y[t0:t1, j], xgb_model=booster)
+        booster = model.get_booster()
+        preds.append(model.predict(scaler.transform(X[p0:p1])))
+    return np.concatenate(preds)
+
+
+def _walk_forward_predict(
+    X: np.ndarray,
+    Y: np.ndarray,
+    horizon: int = 1,
+    min_train: int = 1000,
+    refit_every: int = 500,
+    train_window: int | None = None,
+    warm_start: bool = True,
+    n_estimators: int = 200,
+    refit_estimators: int = 50,
+    random_state: int = 42,
+    n_jobs: int = 1,
+) -> np.ndarray:
+    """
+    Walk-forward 训练 + 样本外预测。
+    :param train_window: None = expanding window；整数 = rolling window 长度
+    :param warm_start: True 时每个 fold 在上一 fold 模型上继续 boosting（refit_estimators 棵树），
+                       各策略的链并行；train_window 为整数时，链起点 fold 的训练数据滑出窗口后
+                       重新冷启动（n_estimators 棵树），模型最多约
+                       n_estimators + refit_estimators * train_window / refit_every 棵树。
+                       False 时每个 (策略, fold) 冷启动、全部并行
+    :return: pred_ret (N, K)，第一个 fold 之前的行为 NaN
+    """
+    n, k = Y.shape
+    folds = _walk_forward_folds(n, horizon, min_train, refit_every, train_window)
+    pred_ret = np.full((n, k), np.nan)
+    if not folds:
+        return pred_ret
+
+    if warm_start:
+        tasks = [(j, folds, n_estimators, refit_estimators, random_state) for j in range(k)]
+        func = _fit_predict_chain
+    else:
+        tasks = [(j, fold, n_estimators, random_state) for j in range(k) for fold in folds]
+        func = _fit_predict_fold
+
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(tasks))
+
+    if n_jobs == 1:
+        tasks = [t + (-1,) for t in tasks]
+        _init_wf_worker(X, Y)
+        try:
+            results = [func(t) for t in tasks]
+        finally:
+            _WF_STATE.clear()
+    else:
+        # 进程间并行时每个模型单线程，避免超额订阅
+        tasks = [t + (1,) for t in tasks]
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, initializer=_init_wf_worker, initargs=(X, Y)
+        ) as pool:
+            results = list(pool.map(func, tasks))
+
+    start = folds[0][2]
+    if warm_start:
+        for j, pred in enumerate(results):
+            pred_ret[start:, j] = pred
+    else:
+        for (j, (_, _, p0, p1), *_), pred in zip(tasks, results):
+            pred_ret[p0:p1, j] = pred
+
+    return pred_ret
+
+
 def meta_xgb_weight_strategy(
     df: pd.DataFrame,
     horizon: int = 1,
@@ -170,6 +312,13 @@ def meta_xgb_weight_strategy(
     scaler: StandardScaler | None = None,
     feature_cols: list[str] | None = None,
     temperature: float = 1.0,
+    walk_forward: bool = False,
+    min_train: int = 1000,
+    refit_every: int = 500,
+    train_window: int | None = None,
+    warm_start: bool = True,
+    refit_estimators: int = 50,
+    n_jobs: int = 1,
 ) -> pd.DataFrame:
     """
     XGBoost 权重版 Meta 策略：
@@ -178,12 +327,35 @@ def meta_xgb_weight_strategy(
       2. 将预测收益通过 softmax 转成权重。
       3. 用权重加权各策略当前 signal，得到 final_signal。
 
+    walk_forward=True 时改为滚动重训（见 _walk_forward_predict）：每 refit_every 根 bar
+    重训一次，只用当时之前的数据，权重全部是样本外预测；第一个 fold 之前 signal 为 0。
+
     返回的 df_out 至少包含：
       - "signal"         : 最终合成信号
       - "signal_ma"...   : 各底层策略信号
       - "weight_ma"...   : 各底层策略权重
     """
 
+    with compute_context() as ctx:
+        if walk_forward:
+            return _meta_xgb_walk_forward_signal(
+                ctx,
+                df,
+                horizon=horizon,
+                temperature=temperature,
+                min_train=min_train,
+                refit_every=refit_every,
+                train_window=train_window,
+                warm_start=warm_start,
+                refit_estimators=refit_estimators,
+                n_jobs=n_jobs,
+            )
+        return _meta_xgb_weight_signal(
+            ctx, df, horizon, retrain, models, scaler, feature_cols, temperature
+        )
+
+
+def _meta_xgb_weight_signal(ctx, df, horizon, retrain, models, scaler, feature_cols, temperature):
     df_raw = df.copy()
 
     # 1) 训练模型（或使用外部传入的已训练模型）
@@ -193,36 +365,22 @@ def meta_xgb_weight_strategy(
             horizon=horizon,
         )
     else:
-        # 如果使用外部模型，需要重新构造特征，但保证列名一致
-        from src.factors.factor_engine import generate_factors
-
-        df_fac = generate_factors(df_raw.copy()).dropna()
-        idx = df_fac.index
-        X = df_fac.loc[idx, feature_cols].values
-        # NOTE: 下面会重用这个 X_scaled
-        X_scaled = scaler.transform(X)
+        idx = ctx.factors(df_raw).dropna().index
 
     strat_names = list(models.keys())
 
-    # 2) 再算一遍因子表（与训练一致），得到 X_scaled
-    from src.factors.factor_engine import generate_factors
-
-    df_fac = generate_factors(df_raw.copy()).dropna()
+    # 2) 因子表（与训练共用同一份），得到 X_scaled
+    df_fac = ctx.factors(df_raw).dropna()
     df_fac = df_fac.loc[idx]  # 对齐索引
     X = df_fac[feature_cols].values
     X_scaled = scaler.transform(X)
 
     # 3) 底层策略信号（在相同 idx 上）
-    df_ma = ma_strategy(df_raw.copy()).loc[idx]
-    df_rsi = rsi_strategy(df_raw.copy()).loc[idx]
-    df_macd = macd_strategy(df_raw.copy()).loc[idx]
-    df_boll = bollinger_strategy(df_raw.copy()).loc[idx]
-
     strat_signal_map = {
-        "ma": df_ma["signal"],
-        "rsi": df_rsi["signal"],
-        "macd": df_macd["signal"],
-        "bollinger": df_boll["signal"],
+        "ma": ctx.signal(df_raw, ma_strategy).loc[idx],
+        "rsi": ctx.signal(df_raw, rsi_strategy).loc[idx],
+        "macd": ctx.signal(df_raw, macd_strategy).loc[idx],
+        "bollinger": ctx.signal(df_raw, bollinger_strategy).loc[idx],
     }
 
     # 4) 用每个模型预测未来收益 → 预测矩阵 pred_ret: (N, K)
@@ -234,12 +392,34 @@ def meta_xgb_weight_strategy(
         model = models[strat]
         pred_ret[:, j] = model.predict(X_scaled)
 
+    return _combine_weighted_signal(df_raw, idx, strat_names, strat_signal_map, pred_ret, temperature)
+
+
+def _meta_xgb_walk_forward_signal(ctx, df, horizon, temperature, **wf_kwargs):
+    df_raw = df.copy()
+
+    idx, X, Y, feature_cols, strat_names = _build_meta_dataset(df_raw, horizon=horizon)
+    pred_ret = _walk_forward_predict(X, Y, horizon=horizon, **wf_kwargs)
+
+    strat_signal_map = {
+        "ma": ctx.signal(df_raw, ma_strategy).loc[idx],
+        "rsi": ctx.signal(df_raw, rsi_strategy).loc[idx],
+        "macd": ctx.signal(df_raw, macd_strategy).loc[idx],
+        "bollinger": ctx.signal(df_raw, bollinger_strategy).loc[idx],
+    }
+
+    return _combine_weighted_signal(df_raw, idx, strat_names, strat_signal_map, pred_ret, temperature)
+
+
+def _combine_weighted_signal(df_raw, idx, strat_names, strat_signal_map, pred_ret, temperature):
+    N = pred_ret.shape[0]
+
     # 5) 用 temperature 控制 softmax 平滑度，得到权重矩阵 (N, K)
     if temperature <= 0:
         temperature = 1.0
 
     scores = pred_ret / temperature
-    # 数值稳定 softmax
+    # 数值稳定 softmax（walk-forward 之前没有预测的行保持 NaN）
     scores = scores - scores.max(axis=1, keepdims=True)
     exp_scores = np.exp(scores)
     weights = exp_scores / exp_scores.sum(axis=1, keepdims=True)
@@ -257,6 +437,7 @@ def meta_xgb_weight_strategy(
     final_signal = np.zeros(N, dtype=float)
     for j, strat in enumerate(strat_names):
         final_signal += weights[:, j] * df_out[f"signal_{strat}"].values
+    final_signal[np.isnan(final_signal)] = 0.0
 
     # 你可以直接用连续仓位，或者再 threshold 成 { -1,0,1 }
     df_out["signal_raw"] = final_signal
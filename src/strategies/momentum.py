@@ -1,4 +1,5 @@
 import pandas as pd
+from .signal import hold_last_nonzero
 
 def momentum_strategy(
     df: pd.DataFrame,
@@ -14,6 +15,6 @@ def momentum_strategy(
     df.loc[df["momentum"] > 0, "signal_raw"] = 1
     df.loc[df["momentum"] < 0, "signal_raw"] = -1
 
-    df["signal"] = df["signal_raw"].replace(0, pd.NA).ffill().fillna(0).astype(float)
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
@@ -0,0 +1,174 @@
+# src/strategies/panel.py
+"""
+Panel (time × symbol) versions of the base strategies.
+
+Each function takes the panel dict produced by src.data.panel.load_panel and
+returns the signal panel, computing every symbol at once with column-wise
+pandas / NumPy operations. The rules mirror the single-symbol strategies.
+"""
+import numpy as np
+import pandas as pd
+
+from src.utils.rolling import rolling_mean, rolling_std
+
+from . import STRATEGY_REGISTRY
+from .signal import hold_last_nonzero
+
+
+def _latch(signal_raw: pd.DataFrame) -> pd.DataFrame:
+    held = hold_last_nonzero(signal_raw.to_numpy(dtype=float))
+    return pd.DataFrame(held, index=signal_raw.index, columns=signal_raw.columns)
+
+
+def _cross_signal(up: pd.DataFrame, down: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    raw = np.where(up, 1.0, np.where(down, -1.0, 0.0))
+    return _latch(pd.DataFrame(raw, index=like.index, columns=like.columns))
+
+
+def ma_panel(panel, short_window: int = 10, long_window: int = 50, price_col: str = "Close"):
+    price = panel[price_col]
+    ma_short = rolling_mean(price, short_window).bfill()
+    ma_long = rolling_mean(price, long_window).bfill()
+    return _cross_signal(ma_short > ma_long, ma_short < ma_long, price)
+
+
+def rsi_panel(panel, window: int = 14, rsi_low: int = 30, rsi_high: int = 70, price_col: str = "Close"):
+    price = panel[price_col]
+    delta = price.diff()
+
+    avg_gain = delta.clip(lower=0).rolling(window).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(window).mean()
+
+    rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    return _cross_signal(rsi < rsi_low, rsi > rsi_high, price)
+
+
+def macd_panel(panel, fast: int = 12, slow: int = 26, signal_window: int = 9, price_col: str = "Close"):
+    price = panel[price_col]
+    macd = (
+        price.ewm(span=fast, adjust=False).mean()
+        - price.ewm(span=slow, adjust=False).mean()
+    )
+    macd_signal = macd.ewm(span=signal_window, adjust=False).mean()
+    return _cross_signal(macd > macd_signal, macd < macd_signal, price)
+
+
+def bollinger_panel(panel, window: int = 20, num_std: float = 2.0, price_col: str = "Close"):
+    price = panel[price_col]
+    ma = rolling_mean(price, window)
+    std = rolling_std(price, window)
+    return _cross_signal(price < ma - num_std * std, price > ma + num_std * std, price)
+
+
+def breakout_panel(panel, high_window: int = 20, low_window: int = 10):
+    close = panel["Close"]
+    highest = panel["High"].rolling(high_window).max().bfill()
+    lowest = panel["Low"].rolling(low_window).min().bfill()
+    return _cross_signal(close > highest, close < lowest, close)
+
+
+def momentum_panel(panel, lookback: int = 20):
+    close = panel["Close"]
+    momentum = (close - close.shift(lookback)).bfill()
+    return _cross_signal(momentum > 0, momentum < 0, close)
+
+
+def zscore_panel(panel, window: int = 20, z_entry: float = 2.0):
+    price = panel["Close"]
+    zscore = ((price - rolling_mean(price, window)) / rolling_std(price, window)).bfill()
+    return _cross_signal(zscore < -z_entry, zscore > z_entry, price)
+
+
+def meta_regime_panel(
+    panel,
+    trend_ma_short: int = 50,
+    trend_ma_long: int = 200,
+    trend_threshold: float = 0.01,
+    trend_mode: str = "momentum",
+    ma_short_window: int = 20,
+    ma_long_window: int = 100,
+    breakout_high_window: int = 20,
+    breakout_low_window: int = 10,
+    momentum_lookback: int = 20,
+    zscore_window: int = 20,
+    zscore_entry: float = 2.0,
+):
+    price = panel["Close"]
+    ma_s = rolling_mean(price, trend_ma_short).bfill()
+    ma_l = rolling_mean(price, trend_ma_long).bfill()
+    is_trend = ((ma_s - ma_l).abs() / price) > trend_threshold
+
+    if trend_mode == "ma":
+        signal_trend = ma_panel(panel, short_window=ma_short_window, long_window=ma_long_window)
+    elif trend_mode == "breakout":
+        signal_trend = breakout_panel(panel, high_window=breakout_high_window, low_window=breakout_low_window)
+    elif trend_mode == "momentum":
+        signal_trend = momentum_panel(panel, lookback=momentum_lookback)
+    else:
+        raise ValueError(
+            f"未知 trend_mode: {trend_mode}, 只能是 'ma' / 'breakout' / 'momentum'"
+        )
+
+    signal_range = zscore_panel(panel, window=zscore_window, z_entry=zscore_entry)
+
+    raw = signal_trend.where(is_trend, signal_range)
+    return _latch(raw)
+
+
+PANEL_STRATEGY_REGISTRY = {
+    "ma": ma_panel,
+    "rsi": rsi_panel,
+    "macd": macd_panel,
+    "bollinger": bollinger_panel,
+    "breakout": breakout_panel,
+    "momentum": momentum_panel,
+    "zscore": zscore_panel,
+    "meta_regime": meta_regime_panel,
+}
+
+
+def _hold_through_gaps(signal: pd.DataFrame, close: pd.DataFrame) -> pd.DataFrame:
+    """
+    没有价格的 bar 不交易：停牌缺口内沿用缺口前最后一根有价格 bar 的信号
+    （引擎用前向填充的 close 把跨缺口收益记到下一根有价格的 bar），
+    上市前 / 退市后不持仓。
+    """
+    priced = close.notna()
+    inside = close.ffill().notna() & close.bfill().notna()
+    carried = signal.where(priced).ffill().where(inside)
+    return signal.where(priced, carried).fillna(0.0)
+
+
+def _per_symbol_signal(panel, name: str, **params) -> pd.DataFrame:
+    """没有向量化版本的策略（ML 类）：逐标的调用单标的策略。"""
+    close = panel["Close"]
+    out = pd.DataFrame(np.nan, index=close.index, columns=close.columns)
+
+    for sym in close.columns:
+        df = pd.DataFrame({field: wide[sym] for field, wide in panel.items()})
+        df = df.dropna(subset=["Close"])
+        if df.empty:
+            continue
+        sig = STRATEGY_REGISTRY[name](df, **params)["signal"]
+        out.loc[sig.index, sym] = sig.astype(float)
+
+    return _hold_through_gaps(out, close)
+
+
+def apply_strategy_panel(panel, name: str, **params) -> pd.DataFrame:
+    """
+    对 panel 中所有标的应用策略，返回 (time × symbol) 的 signal DataFrame。
+    基础策略一次性向量化计算（缺口内的价格前向填充）；
+    其余已注册策略逐标的回退到单标的实现。
+    """
+    if name in PANEL_STRATEGY_REGISTRY:
+        # 停牌缺口内沿用上一价格，避免 rolling 窗口因 NaN 整段失效
+        filled = {
+            field: wide.ffill(limit_area="inside") if field != "Volume" else wide
+            for field, wide in panel.items()
+        }
+        signal = PANEL_STRATEGY_REGISTRY[name](filled, **params)
+        return _hold_through_gaps(signal, panel["Close"])
+    if name in STRATEGY_REGISTRY:
+        return _per_symbol_signal(panel, name, **params)
+    raise ValueError(f"未知策略 '{name}', 可选: {list(STRATEGY_REGISTRY.keys())}")
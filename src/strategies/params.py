@@ -47,6 +47,14 @@ STRATEGY_PARAM_MAP = {
         "horizon": 1,
         "retrain": True,
         "temperature": 1.0,
+
+        "walk_forward": False,
+        "min_train": 1000,
+        "refit_every": 500,
+        "train_window": None,      # None = expanding window
+        "warm_start": True,
+        "refit_estimators": 50,
+        "n_jobs": 1,
     }
 }
 
@@ -1,4 +1,5 @@
 import pandas as pd
+from .signal import hold_last_nonzero
 
 def rsi_strategy(
     df: pd.DataFrame,
@@ -27,6 +28,6 @@ def rsi_strategy(
     df.loc[df["rsi"] < rsi_low, "signal_raw"] = 1
     df.loc[df["rsi"] > rsi_high, "signal_raw"] = -1
 
-    df["signal"] = df["signal_raw"].replace(0, pd.NA).ffill().fillna(0).astype(float)
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
@@ -0,0 +1,34 @@
+# src/strategies/signal.py
+import numpy as np
+
+
+def hold_last_nonzero(signal_raw) -> np.ndarray:
+    """
+    “持有最后一个非零信号”：0（以及 NaN）沿用前面最近的非零值，开头没有非零值时为 0。
+    与 signal_raw.replace(0, pd.NA).ffill().fillna(0).astype(float) 结果相同，
+    但直接在 int8 / float 数组上做，不经过 object dtype。
+
+    :param signal_raw: 1-D (N,) 或 2-D (N, M) 数组 / Series / DataFrame，沿 axis 0 填充
+    :return: float64 ndarray，shape 与输入相同
+    """
+    x = np.asarray(signal_raw)
+    if x.ndim not in (1, 2):
+        raise ValueError(f"hold_last_nonzero 需要 1-D / 2-D 数组，得到 shape={x.shape}")
+
+    valid = x != 0
+    if x.dtype.kind == "f":
+        valid &= ~np.isnan(x)
+
+    n = x.shape[0]
+    rows = np.arange(n).reshape((n,) + (1,) * (x.ndim - 1))
+
+    # 每个位置上最近一个有效信号的行号（没有时为 -1）
+    last = np.where(valid, rows, -1)
+    np.maximum.accumulate(last, axis=0, out=last)
+
+    if x.ndim == 1:
+        held = x[np.maximum(last, 0)]
+    else:
+        held = np.take_along_axis(x, np.maximum(last, 0), axis=0)
+
+    return np.where(last >= 0, held, 0).astype(float)
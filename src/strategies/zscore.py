@@ -1,5 +1,8 @@
 import pandas as pd
 
+from src.utils.rolling import rolling_mean, rolling_std
+from .signal import hold_last_nonzero
+
 def zscore_strategy(
     df: pd.DataFrame,
     window: int = 20,
@@ -9,8 +12,8 @@ def zscore_strategy(
     df = df.copy()
     price = df["Close"]
 
-    ma = price.rolling(window).mean()
-    std = price.rolling(window).std()
+    ma = rolling_mean(price, window)
+    std = rolling_std(price, window)
 
     df["zscore"] = (price - ma) / std
     df["zscore"].bfill(inplace=True)
@@ -19,6 +22,6 @@ def zscore_strategy(
     df.loc[df["zscore"] < -z_entry, "signal_raw"] = 1
     df.loc[df["zscore"] >  z_entry, "signal_raw"] = -1
 
-    df["signal"] = df["signal_raw"].replace(0, pd.NA).ffill().fillna(0).astype(float)
+    df["signal"] = hold_last_nonzero(df["signal_raw"].to_numpy())
 
     return df
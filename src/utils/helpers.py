@@ -3,6 +3,8 @@ import os
 import time
 from contextlib import contextmanager
 
+from src.utils.profiler import span
+
 
 def ensure_dir(path: str):
     folder = os.path.dirname(path)
@@ -22,7 +24,9 @@ def time_block(name: str):
     start = time.time()
     print(f"⏱  {name} ...")
     try:
-        yield
+        # profiling 开启时同时记录为一个 span
+        with span(name):
+            yield
     finally:
         end = time.time()
         print(f"✅  {name} using:  {end - start:.2f}s\n")
@@ -0,0 +1,18 @@
+# src/utils/jit.py
+"""
+Optional numba JIT.
+
+Path-dependent loops (exit overlay, turnover limits) are decorated with njit.
+numba is not a hard dependency: without it njit is a no-op decorator and the
+same functions run as plain Python (identical results, much slower).
+"""
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
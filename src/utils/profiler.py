@@ -0,0 +1,275 @@
+# src/utils/profiler.py
+"""
+Hierarchical span profiler.
+
+    prof = enable_profiling()
+    with span("load", rows=len(df)):
+        ...
+        with span("factors") as sp:
+            fac = generate_factors(df)
+            sp.rows = len(fac)
+    disable_profiling()
+    prof.export_json("results/profile/run.json")
+    prof.export_chrome_trace("results/profile/run.trace.json")   # chrome://tracing / Perfetto
+
+Each span records wall time, CPU time, peak traced memory above the memory in
+use when the span opened (tracemalloc), and an optional row count. While no
+profiler is enabled, span() returns a shared no-op object, so instrumented
+code pays one global lookup per call.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+class Span:
+    __slots__ = (
+        "name", "rows", "attrs", "children", "tid",
+        "start_ns", "wall", "cpu", "peak_mem",
+        "_cpu0", "_mem0", "_abs_peak",
+    )
+
+    def __init__(self, name, rows=None, attrs=None):
+        self.name = name
+        self.rows = rows
+        self.attrs = attrs or {}
+        self.children = []
+        self.tid = threading.get_ident()
+        self.start_ns = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_mem = None
+        self._mem0 = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "wall_s": self.wall,
+            "cpu_s": self.cpu,
+            "peak_mem_bytes": self.peak_mem,
+            "rows": self.rows,
+            "attrs": self.attrs,
+            "children": [c.to_dict() for c in self.children],
+        }
+
+
+class _NullSpan:
+    """关闭 profiling 时 span() 返回的单例：上下文管理器 + 可随意赋值属性。"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _SpanContext:
+    __slots__ = ("profiler", "span")
+
+    def __init__(self, profiler, span):
+        self.profiler = profiler
+        self.span = span
+
+    def __enter__(self):
+        self.profiler._open(self.span)
+        return self.span
+
+    def __exit__(self, *exc):
+        self.profiler._close(self.span)
+        return False
+
+
+class Profiler:
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.roots = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._t0_ns = time.perf_counter_ns()
+        self._started_tracemalloc = False
+
+    # ----------------------------------------------------------
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def span(self, name: str, rows=None, **attrs):
+        return _SpanContext(self, Span(name, rows, attrs))
+
+    def _open(self, sp: Span):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+
+        if self.trace_memory and tracemalloc.is_tracing():
+            cur, peak = tracemalloc.get_traced_memory()
+            # 重置前把到目前为止的峰值记到父 span 上
+            if parent is not None and parent._mem0 is not None:
+                parent._abs_peak = max(parent._abs_peak, peak)
+            tracemalloc.reset_peak()
+            sp._mem0 = cur
+            sp._abs_peak = cur
+        else:
+            sp._mem0 = None
+
+        if parent is not None:
+            parent.children.append(sp)
+        else:
+            with self._lock:
+                self.roots.append(sp)
+        stack.append(sp)
+
+        sp._cpu0 = time.process_time()
+        sp.start_ns = time.perf_counter_ns()
+
+    def _close(self, sp: Span):
+        end_ns = time.perf_counter_ns()
+        sp.wall = (end_ns - sp.start_ns) / 1e9
+        sp.cpu = time.process_time() - sp._cpu0
+
+        stack = self._stack()
+        stack.pop()
+        parent = stack[-1] if stack else None
+
+        if sp._mem0 is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            sp._abs_peak = max(sp._abs_peak, peak)
+            sp.peak_mem = sp._abs_peak - sp._mem0
+            # 子 span 的峰值同样是父 span 的峰值
+            if parent is not None and parent._mem0 is not None:
+                parent._abs_peak = max(parent._abs_peak, sp._abs_peak)
+
+    # ----------------------------------------------------------
+    # Export
+    # ----------------------------------------------------------
+    def to_dict(self) -> dict:
+        return {"spans": [s.to_dict() for s in self.roots]}
+
+    def export_json(self, path: str):
+        _ensure_parent(path)
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+    def export_chrome_trace(self, path: str):
+        """Chrome trace event 格式（complete events），可在 chrome://tracing 或 Perfetto 打开。"""
+        events = []
+        pid = os.getpid()
+
+        def walk(sp):
+            args = {"cpu_s": sp.cpu, "peak_mem_bytes": sp.peak_mem, "rows": sp.rows}
+            args.update(sp.attrs)
+            events.append({
+                "name": sp.name,
+                "ph": "X",
+                "ts": (sp.start_ns - self._t0_ns) / 1e3,
+                "dur": sp.wall * 1e6,
+                "pid": pid,
+                "tid": sp.tid,
+                "args": args,
+            })
+            for c in sp.children:
+                walk(c)
+
+        for sp in self.roots:
+            walk(sp)
+
+        _ensure_parent(path)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def report(self) -> str:
+        """
+        缩进的文本表格：wall / cpu / peak mem / rows。
+        同一父节点下同名的 span（如 grid search 的每次 evaluate）合并成一行：
+        wall / cpu 求和，peak 取最大，名字后标注次数。
+        """
+        lines = [f"{'span':<44} {'wall(s)':>9} {'cpu(s)':>9} {'peak(MiB)':>10} {'rows':>10}"]
+
+        def walk(spans, depth):
+            groups = {}
+            for sp in spans:
+                groups.setdefault(sp.name, []).append(sp)
+
+            for name, group in groups.items():
+                wall = sum(sp.wall for sp in group)
+                cpu = sum(sp.cpu for sp in group)
+                peaks = [sp.peak_mem for sp in group if sp.peak_mem is not None]
+                rows = group[0].rows
+
+                label = name if len(group) == 1 else f"{name} x{len(group)}"
+                label = ("  " * depth + label)[:44]
+                mem = f"{max(peaks) / 2**20:.1f}" if peaks else ""
+                rows = "" if rows is None else f"{rows:,}"
+                lines.append(f"{label:<44} {wall:>9.3f} {cpu:>9.3f} {mem:>10} {rows:>10}")
+
+                walk([c for sp in group for c in sp.children], depth + 1)
+
+        walk(self.roots, 0)
+        return "\n".join(lines)
+
+
+def _ensure_parent(path: str):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+
+# ============================================================
+# 全局开关
+# ============================================================
+_PROFILER = None
+
+
+def enable_profiling(trace_memory: bool = True) -> Profiler:
+    """开启全局 profiler 并返回它；之后所有 span() 调用都会被记录。"""
+    global _PROFILER
+    if _PROFILER is not None:
+        _PROFILER.stop()
+    _PROFILER = Profiler(trace_memory=trace_memory).start()
+    return _PROFILER
+
+
+def disable_profiling():
+    """关闭全局 profiler，返回它（已记录的 span 仍可导出）。"""
+    global _PROFILER
+    prof, _PROFILER = _PROFILER, None
+    if prof is not None:
+        prof.stop()
+    return prof
+
+
+def get_profiler():
+    return _PROFILER
+
+
+def span(name: str, rows=None, **attrs):
+    """
+    with span("engine", rows=len(df)) as sp: ...
+    未开启 profiling 时返回共享的 no-op 对象。
+    """
+    prof = _PROFILER
+    if prof is None:
+        return _NULL_SPAN
+    return _SpanContext(prof, Span(name, rows, attrs))
@@ -0,0 +1,114 @@
+# src/utils/rolling.py
+"""
+Memoised rolling-window cache.
+
+A RollingWindowCache holds one price series (or a (time × symbol) matrix) and
+serves its rolling mean / std for any window, computing each window only once,
+so a parameter sweep computes e.g. the 20-bar mean a single time.
+
+Values come from pandas rolling(), so they are bit-identical to
+price.rolling(window) outside the cache: a sweep and a single apply_strategy
+call with the same parameters produce the same signals. (Global prefix sums
+are faster but cancel catastrophically on long trending series and flip
+comparisons such as MA crossovers and Bollinger bands.)
+
+Strategies call rolling_mean / rolling_std; while a cache for the same price
+data is active (use_rolling_cache), those calls are served from it, otherwise
+they fall back to price.rolling(window).
+"""
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+class RollingWindowCache:
+
+    def __init__(self, values):
+        x = np.array(values, dtype=float)
+        if x.ndim not in (1, 2):
+            raise ValueError(f"RollingWindowCache 需要 1-D / 2-D 数组，得到 shape={x.shape}")
+
+        self.values = x
+        self._frame = pd.DataFrame(x)
+
+        self._means = {}
+        self._stds = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def matches(self, values) -> bool:
+        values = np.asarray(values)
+        if values.shape != self.values.shape:
+            return False
+        return values is self.values or np.array_equal(values, self.values)
+
+    def _rolling(self, window: int):
+        if window < 1:
+            raise ValueError(f"window 必须 >= 1，得到 {window}")
+        return self._frame.rolling(window)
+
+    def mean(self, window: int) -> np.ndarray:
+        window = int(window)
+        if window not in self._means:
+            mean = self._rolling(window).mean().to_numpy()
+            self._means[window] = mean.reshape(self.values.shape)
+        return self._means[window]
+
+    def std(self, window: int) -> np.ndarray:
+        """样本标准差 (ddof=1)，与 pandas rolling().std() 一致。"""
+        window = int(window)
+        if window not in self._stds:
+            std = self._rolling(window).std().to_numpy()
+            self._stds[window] = std.reshape(self.values.shape)
+        return self._stds[window]
+
+
+# ============================================================
+# 自动接入：strategies 通过下面两个函数取 rolling 结果
+# ============================================================
+_ACTIVE = []
+
+
+@contextmanager
+def use_rolling_cache(values):
+    """
+    在 with 块内，对与 values 数据相同的序列调用 rolling_mean / rolling_std
+    都走缓存。values 可以是 Series / DataFrame / ndarray 或现成的 cache。
+    """
+    cache = values if isinstance(values, RollingWindowCache) else RollingWindowCache(values)
+    _ACTIVE.append(cache)
+    try:
+        yield cache
+    finally:
+        _ACTIVE.remove(cache)
+
+
+def _lookup(price):
+    for cache in reversed(_ACTIVE):
+        if cache.matches(price):
+            return cache
+    return None
+
+
+def _wrap(arr: np.ndarray, like):
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(arr.copy(), index=like.index, columns=like.columns)
+    return pd.Series(arr.copy(), index=like.index, name=like.name)
+
+
+def rolling_mean(price, window: int):
+    """price.rolling(window).mean()，有匹配的缓存时直接查表。"""
+    cache = _lookup(price)
+    if cache is None:
+        return price.rolling(window).mean()
+    return _wrap(cache.mean(window), price)
+
+
+def rolling_std(price, window: int):
+    """price.rolling(window).std()，有匹配的缓存时直接查表。"""
+    cache = _lookup(price)
+    if cache is None:
+        return price.rolling(window).std()
+    return _wrap(cache.std(window), price)